@@ -19,6 +19,12 @@ type Entry = {
 	type: string;
 	chess_meta: string;
 	chess_fen: string;
+	narrationPath: string | null;
+	narrationTimelinePath: string | null;
+	renderProfile: string | null;
+	generatedXThumbnailPath: string | null;
+	generatedSubtitlePath: string | null;
+	generatedVerticalVideoPath: string | null;
 };
 
 // Logging function for structured logs
@@ -49,7 +55,13 @@ async function initDatabase(alter = false) {
 				tweetId TEXT,
 				type TEXT,
 				chess_meta TEXT,
-				chess_fen TEXT
+				chess_fen TEXT,
+				narrationPath TEXT,
+				narrationTimelinePath TEXT,
+				renderProfile TEXT,
+				generatedXThumbnailPath TEXT,
+				generatedSubtitlePath TEXT,
+				generatedVerticalVideoPath TEXT
 			)`);
 
 		log("Database initialized.");
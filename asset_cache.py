@@ -0,0 +1,114 @@
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageFont
+import custom_env
+import logger_config
+
+MAX_SOURCES = 4
+
+_lock = threading.Lock()
+_backgrounds = OrderedDict()
+_background_bytes = 0
+_fonts = OrderedDict()
+_sources = OrderedDict()
+_source_bytes = 0
+_stats = {
+    'background_hits': 0,
+    'background_misses': 0,
+    'font_hits': 0,
+    'font_misses': 0,
+    'source_hits': 0,
+    'source_misses': 0,
+    'evictions': 0,
+}
+
+def _orientation(size):
+    return 'portrait' if size[1] > size[0] else 'landscape'
+
+def _image_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+def get_stats():
+    stats = dict(_stats, backgrounds=len(_backgrounds), background_bytes=_background_bytes, sources=len(_sources), source_bytes=_source_bytes, fonts=len(_fonts))
+    for kind in ('background', 'font', 'source'):
+        lookups = _stats[f'{kind}_hits'] + _stats[f'{kind}_misses']
+        stats[f'{kind}_hit_rate'] = _stats[f'{kind}_hits'] / lookups if lookups else 0.0
+    return stats
+
+def _evict():
+    # Called with _lock held. Originals and resized backgrounds share one byte budget; originals go first
+    # since they only save a decode when the same file is asked for at another size
+    global _background_bytes, _source_bytes
+    while _sources and (len(_sources) > MAX_SOURCES or _background_bytes + _source_bytes > custom_env.ASSET_CACHE_MAX_BYTES):
+        _, evicted = _sources.popitem(last=False)
+        _source_bytes -= _image_bytes(evicted)
+        _stats['evictions'] += 1
+    while _background_bytes + _source_bytes > custom_env.ASSET_CACHE_MAX_BYTES and len(_backgrounds) > 1:
+        _, evicted = _backgrounds.popitem(last=False)
+        _background_bytes -= _image_bytes(evicted)
+        _stats['evictions'] += 1
+
+def _get_source(path, mtime):
+    # The decoded original, so targets of different sizes (16:9 and 9:16) decode each file once
+    global _source_bytes
+    key = (path, mtime)
+    with _lock:
+        image = _sources.get(key)
+        if image is not None:
+            _sources.move_to_end(key)
+            _stats['source_hits'] += 1
+            return image
+        _stats['source_misses'] += 1
+
+    image = Image.open(path)
+    image.load()
+    with _lock:
+        if key not in _sources:
+            _sources[key] = image
+            _source_bytes += _image_bytes(image)
+        _evict()
+    return image
+
+def get_background(path, size):
+    """Decoded background resized to `size`. Callers get their own copy and may draw on it."""
+    global _background_bytes
+    size = tuple(size)
+    # mtime is part of the key because the chess boards are re-rendered under the same file names
+    key = (path, os.path.getmtime(path), size, _orientation(size))
+    with _lock:
+        image = _backgrounds.get(key)
+        if image is not None:
+            _backgrounds.move_to_end(key)
+            _stats['background_hits'] += 1
+            return image.copy()
+        _stats['background_misses'] += 1
+
+    image = _get_source(path, key[1]).resize(size)
+    with _lock:
+        if key not in _backgrounds:
+            _backgrounds[key] = image
+            _background_bytes += _image_bytes(image)
+        _evict()
+    return image.copy()
+
+def get_font(path, size):
+    key = (path, size)
+    with _lock:
+        font = _fonts.get(key)
+        if font is not None:
+            _fonts.move_to_end(key)
+            _stats['font_hits'] += 1
+            return font
+        _stats['font_misses'] += 1
+
+    font = ImageFont.truetype(path, size)
+    with _lock:
+        _fonts[key] = font
+        while len(_fonts) > custom_env.ASSET_CACHE_MAX_FONTS:
+            _fonts.popitem(last=False)
+            _stats['evictions'] += 1
+    return font
+
+def log_stats():
+    logger_config.info(f"Asset cache:: {get_stats()}")
@@ -1,4 +1,3 @@
-import whisper
 from moviepy.editor import *
 from PIL import Image, ImageDraw, ImageFont
 import os
@@ -8,6 +7,8 @@ import sqlite3
 import riddle_parser
 import create_riddles
 import logger_config
+import resize_image
+import transcriber
 
 BACKGROUND_IMAGES_N = 11  # Total number of background images available
 BACKGROUND_LABEL = 'background'
@@ -23,11 +24,7 @@ def transcribe_audio(audio_path):
     try:
         logger_config.info(f"Starting audio transcription for: {audio_path}")
 
-        # Load the Whisper model without weights_only parameter
-        model = whisper.load_model("base")
-        logger_config.info("Whisper model loaded successfully")
-
-        result = model.transcribe(audio_path, word_timestamps=True)
+        result = transcriber.transcribe(audio_path, word_timestamps=True)
         logger_config.info(f"Transcription completed successfully for: {audio_path}")
         
         return result['text'], result['segments']
@@ -163,27 +160,7 @@ def create_text_image(text, background_path, temp_filename, font_path, font_size
 
 def resize_thumbnail(thumbnail_path):
     """Resize and compress the thumbnail image if it's larger than 2 MB."""
-    logger_config.info(f"Checking thumbnail size: {thumbnail_path}")
-    max_file_size = 2 * 1024 * 1024  # 2 MB
-    try:
-        img = Image.open(thumbnail_path)
-        file_size = os.path.getsize(thumbnail_path)
-        if file_size > max_file_size:
-            logger_config.info(f"Resizing thumbnail {thumbnail_path}")
-            img.thumbnail((1280, 720))
-            quality = 95
-            while file_size > max_file_size:
-                img.save(thumbnail_path, format='PNG', quality=quality)
-                file_size = os.path.getsize(thumbnail_path)
-                quality -= 5
-                logger_config.info(f"Waiting before new resize", )
-            logger_config.info(f"Resized thumbnail to {file_size / 1024:.2f} KB with quality {quality}%")
-        else:
-            logger_config.info(f"Thumbnail {thumbnail_path} is within size limits")
-        return thumbnail_path
-    except Exception as e:
-        logger_config.error(f"Error resizing thumbnail: {str(e)}")
-        return thumbnail_path
+    return resize_image.start(thumbnail_path, max_dimensions=(1280, 720))
 
 def show_answer(end, total_duration, sentence, bottom_static_text):
     global SHOW_ANSWER
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import wave
+import random
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image, ImageDraw
+import logger_config
+import custom_env
+import asset_cache
+import caption_layers
+import render_profiles
+import slide_encoder
+import text_layout
+import text_render
+
+BENCH_PATH = 'bench'
+FONT_PATH = os.path.join('Fonts', 'font_1.ttf')
+BACKGROUNDS = sorted(os.path.join('background_images', name) for name in os.listdir('background_images') if name.endswith('.jpg'))
+LAYOUT = dict(font_size=70, padding=50, extra_space=100, stroke_width=2)
+# Synthetic narrations with the shapes convertToVideo.process sees in production
+SCENARIOS = {
+    'short': {'type': 'text', 'seconds': 60},
+    'facts': {'type': 'facts', 'seconds': 30},
+    'long_form': {'type': 'long_form_text', 'seconds': 12 * 60, 'puzzle_seconds': 70},
+    'chess': {'type': 'chess', 'seconds': 30, 'moves': 3},
+}
+WORDS = ("the a riddle answer think carefully what has keys but cannot open locks piano clock river "
+         "mountain shadow candle secret mirror whisper morning yesterday tomorrow puzzle clue listen "
+         "everyone hello today next guess first second final time light heavy empty full").split()
+SAMPLE_RATE = 16000
+
+def _sentence(rng, low=6, high=18):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize() + "."
+
+def build_segments(seconds, seed=0):
+    """Whisper-like segments of 2-6 s covering `seconds`."""
+    rng = random.Random(seed)
+    segments = []
+    start = 0.0
+    while start < seconds:
+        end = min(seconds, start + rng.uniform(2, 6))
+        segments.append({'id': len(segments), 'start': round(start, 2), 'end': round(end, 2), 'text': " " + _sentence(rng)})
+        start = end
+    return segments
+
+def _board(path, index):
+    # Chess move boards are a new image per frame, so every one is a base layer miss
+    image = Image.new('RGB', (800, 800), (238, 238, 210))
+    draw = ImageDraw.Draw(image)
+    for square in range(64):
+        if (square // 8 + square) % 2:
+            x, y = square % 8 * 100, square // 8 * 100
+            draw.rectangle((x, y, x + 99, y + 99), fill=(118, 150, 86))
+    x, y = index % 8 * 100, index // 8 % 8 * 100
+    draw.ellipse((x + 20, y + 20, x + 80, y + 80), fill=(20, 20, 20))
+    image.save(path)
+    return path
+
+def build_slides(name, directory, seed=0):
+    """Caption layouts and timings for a scenario: (compose kwargs, start, duration) like convertToVideo.plan."""
+    scenario = SCENARIOS[name]
+    rng = random.Random(seed)
+    img_size = render_profiles.get(scenario['type'])['resolution']
+    slides = []
+
+    if scenario['type'] == 'chess':
+        answer_at = scenario['seconds'] / 2
+        answer = f'Answer at {answer_at}s'
+        slides.append((dict(text='', background_path=BACKGROUNDS[0], answer=answer, type='chess'), 0, answer_at))
+        move_duration = 2 / custom_env.FPS
+        for i in range(scenario['moves'] * custom_env.FPS):
+            board = _board(os.path.join(directory, f'board-{i}.jpg'), i)
+            slides.append((dict(text='', background_path=board, answer=answer, type='chess'), answer_at + i * move_duration, move_duration))
+        return slides, img_size
+
+    segments = build_segments(scenario['seconds'], seed)
+    description, answer = _sentence(rng, 10, 25), _sentence(rng, 1, 4)
+    background_path = BACKGROUNDS[0]
+    for i, segment in enumerate(segments):
+        if scenario['type'] == 'text':
+            layout = dict(description=description, answer=answer if segment['start'] >= scenario['seconds'] * 0.75 else '')
+        elif scenario['type'] == 'long_form_text':
+            puzzle, offset = divmod(segment['start'], scenario['puzzle_seconds'])
+            if i == 0 or offset < segments[i - 1]['start'] % scenario['puzzle_seconds']:
+                background_path = BACKGROUNDS[int(puzzle) % len(BACKGROUNDS)]
+                description, answer = _sentence(rng, 10, 25), _sentence(rng, 1, 4)
+            layout = dict(description=description, answer=answer if offset >= scenario['puzzle_seconds'] * 0.75 else '')
+        else:
+            layout = dict(description='', answer='')
+        duration = round((segments[i + 1]['end'] if i < len(segments) - 1 else segment['end']) - segment['start'], 2)
+        slides.append((dict(layout, text=segment['text'], background_path=background_path), segment['start'], duration))
+    return slides, img_size
+
+def _bands(job, img_size):
+    """The (text, font, max width) each caption band of caption_layers wraps."""
+    padding, extra_space, font_size = LAYOUT['padding'], LAYOUT['extra_space'], LAYOUT['font_size']
+    bands = []
+    if job.get('description'):
+        bands.append((job['description'], asset_cache.get_font(FONT_PATH, int(font_size * 0.8)), img_size[0] - 2 * padding - 2 * extra_space))
+    if job.get('answer'):
+        chess = job.get('type') == 'chess'
+        width = img_size[0] if not chess else (img_size[0] - img_size[1]) / 2
+        text = job['answer'] if chess else f"Answer is :: {job['answer']}"
+        bands.append((text, asset_cache.get_font(FONT_PATH, int(font_size * (1 if chess else 0.8))), width - 2 * padding - 2 * extra_space))
+    if job.get('text'):
+        bands.append((job['text'], asset_cache.get_font(FONT_PATH, font_size), img_size[0] - 2 * padding - 2 * extra_space))
+    return bands
+
+def _write_silence(path, seconds):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(bytes(2 * int(seconds * SAMPLE_RATE)))
+    return path
+
+def _percentiles(values):
+    if not values:
+        return {}
+    return {f'p{p}': round(float(np.percentile(values, p)) * 1000, 3) for p in (50, 90, 99)}
+
+def _peak_rss_mb(who):
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def _run_scenario(name, encode, seed):
+    """Runs in a fresh process so the caches start cold and peak RSS belongs to this scenario only."""
+    with tempfile.TemporaryDirectory() as directory:
+        slides, img_size = build_slides(name, directory, seed)
+        timings = {'layout': [], 'rasterize': [], 'composite': [], 'segment': []}
+        frames = []
+        for job, start, duration in slides:
+            job = dict(job, font_path=FONT_PATH, img_size=img_size, **LAYOUT)
+            started = time.perf_counter()
+            wrapped = [(text_layout.wrap(text, font, width)[0], font) for text, font, width in _bands(job, img_size)]
+            laid_out = time.perf_counter()
+            for lines, font in wrapped:
+                for line in lines:
+                    if line:
+                        text_render.render_line(line, font, LAYOUT['stroke_width'])
+            rasterized = time.perf_counter()
+            # Layout and glyph bitmaps are now cached, so this is the base layer plus pasting
+            frame = np.asarray(caption_layers.compose(**job).convert('RGB'))
+            composited = time.perf_counter()
+
+            timings['layout'].append(laid_out - started)
+            timings['rasterize'].append(rasterized - laid_out)
+            timings['composite'].append(composited - rasterized)
+            timings['segment'].append(composited - started)
+            frames.append((frame, start, duration))
+
+        render_seconds = sum(timings['segment'])
+        total = max(start + duration for _, start, duration in frames)
+        result = {
+            'scenario': name,
+            'type': SCENARIOS[name]['type'],
+            'img_size': list(img_size),
+            'seconds': round(total, 2),
+            'segments': len(frames),
+            'stages': {stage: round(sum(values), 4) for stage, values in timings.items() if stage != 'segment'},
+            'segment_latency_ms': _percentiles(timings['segment']),
+            'render_frames_per_second': round(len(frames) / render_seconds, 2) if render_seconds else 0.0,
+            'caches': {
+                'assets': asset_cache.get_stats(),
+                'layout': text_layout.get_stats(),
+                'text_render': text_render.get_stats(),
+                'caption_layers': caption_layers.get_stats(),
+            },
+        }
+
+        if encode:
+            profile = render_profiles.get(SCENARIOS[name]['type'])
+            audio_path = _write_silence(os.path.join(directory, 'silence.wav'), total)
+            output_path = os.path.join(directory, 'out.mp4')
+            started = time.perf_counter()
+            slide_encoder.write(frames, audio_path, output_path, profile['fps'], duration=total, chunks=custom_env.ENCODE_CHUNKS, **render_profiles.slide_params(profile))
+            encode_seconds = time.perf_counter() - started
+            result['stages']['encode'] = round(encode_seconds, 4)
+            result['encode_frames_per_second'] = round(total * profile['fps'] / encode_seconds, 2)
+            result['output_bytes'] = os.path.getsize(output_path)
+
+    result['peak_rss_mb'] = round(_peak_rss_mb(resource.RUSAGE_SELF), 1)
+    result['children_peak_rss_mb'] = round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1)
+    return result
+
+def start(scenarios=list(SCENARIOS), encode=True, seed=0, output_path=None):
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'cpu_count': os.cpu_count(),
+        'fps': custom_env.FPS,
+        'encode_chunks': custom_env.ENCODE_CHUNKS,
+        'seed': seed,
+        'runs': [],
+    }
+
+    for name in scenarios:
+        logger_config.info(f"Benchmarking caption render:: {name}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            run = executor.submit(_run_scenario, name, encode, seed).result()
+        report['runs'].append(run)
+        logger_config.success(f"{name}: {run['segments']} segments, {run['render_frames_per_second']} frames/s, latency:: {run['segment_latency_ms']} stages:: {run['stages']} peak rss:: {run['peak_rss_mb']} MB")
+
+    output_path = output_path or os.path.join(BENCH_PATH, f"render-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger_config.success(f"Benchmark results saved to {output_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark caption layout, rasterization, compositing and encode.")
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--no-encode', action='store_true', help="Skip the ffmpeg encode stage")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    start(args.scenarios, not args.no_encode, args.seed, args.output)
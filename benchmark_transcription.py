@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import math
+import argparse
+import resource
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import whisper
+import logger_config
+import custom_env
+import transcriber
+
+CORPUS = ['hello.wav', 'next_puzzle.wav']
+LONG_FORM_SECONDS = [180, 600]
+MODELS = ['base']
+OPTION_SETS = {
+    'word_timestamps': {'word_timestamps': True},
+    'segments_only': {},
+}
+GAP_SECONDS = 1
+BENCH_PATH = 'bench'
+
+def build_corpus(long_form_seconds=LONG_FORM_SECONDS):
+    """Bundled clips plus long-form stand-ins made by looping them with short silences in between."""
+    sample_rate = whisper.audio.SAMPLE_RATE
+    corpus = {path: whisper.load_audio(path) for path in CORPUS}
+
+    gap = np.zeros(GAP_SECONDS * sample_rate, dtype=np.float32)
+    loop = np.concatenate([part for path in CORPUS for part in (corpus[path], gap)])
+    for seconds in long_form_seconds:
+        repeats = math.ceil(seconds * sample_rate / len(loop))
+        corpus[f'long_form_{seconds}s'] = np.tile(loop, repeats)[:seconds * sample_rate]
+    return corpus
+
+def _peak_rss_mb(who):
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def _run_config(model_name, option_name, options, long_form_seconds):
+    """Runs in a fresh process so model load time and peak RSS belong to this configuration only."""
+    custom_env.WHISPER_MODEL = model_name
+    started = time.time()
+    transcriber.get_model()
+    model_load_time = time.time() - started
+
+    results = []
+    for name, audio in build_corpus(long_form_seconds).items():
+        duration = len(audio) / whisper.audio.SAMPLE_RATE
+        started = time.time()
+        result = transcriber.submit(name, audio=audio, **options).result()
+        elapsed = time.time() - started
+        results.append({
+            'audio': name,
+            'duration': round(duration, 2),
+            'elapsed': round(elapsed, 3),
+            'rtf': round(elapsed / duration, 4) if duration else 0.0,
+            'segments': len(result['segments']),
+        })
+
+    # RUSAGE_CHILDREN only covers children that have exited and been reaped, so the window workers are stopped first
+    transcriber.shutdown_window_pool()
+    return {
+        'model': model_name,
+        'options_name': option_name,
+        'options': options,
+        'model_load_time': round(model_load_time, 3),
+        'peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+        'children_peak_rss_mb': round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        'results': results,
+    }
+
+def start(models=MODELS, option_sets=OPTION_SETS, long_form_seconds=LONG_FORM_SECONDS, output_path=None):
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'cpu_count': os.cpu_count(),
+        'transcribe_workers': custom_env.TRANSCRIBE_WORKERS,
+        'windowed_min_seconds': custom_env.WINDOWED_TRANSCRIBE_MIN_SECONDS,
+        'runs': [],
+    }
+
+    for model_name in models:
+        for option_name, options in option_sets.items():
+            logger_config.info(f"Benchmarking model:: {model_name} options:: {option_name}")
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+                run = executor.submit(_run_config, model_name, option_name, options, long_form_seconds).result()
+            report['runs'].append(run)
+
+            logger_config.success(f"model:: {model_name} options:: {option_name} load:: {run['model_load_time']}s peak rss:: {run['peak_rss_mb']} MB")
+            for result in run['results']:
+                logger_config.info(f"  {result['audio']}: {result['duration']}s rtf:: {result['rtf']} segments:: {result['segments']}")
+
+    output_path = output_path or os.path.join(BENCH_PATH, f"transcription-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger_config.success(f"Benchmark results saved to {output_path}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Whisper transcription path.")
+    parser.add_argument('--models', nargs='+', default=MODELS)
+    parser.add_argument('--options', nargs='+', default=list(OPTION_SETS), choices=list(OPTION_SETS))
+    parser.add_argument('--long-form-seconds', nargs='*', type=int, default=LONG_FORM_SECONDS)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    start(args.models, {name: OPTION_SETS[name] for name in args.options}, args.long_form_seconds, args.output)
@@ -0,0 +1,99 @@
+import os
+import threading
+from collections import OrderedDict
+import asset_cache
+import custom_env
+import logger_config
+import text_layout
+import text_render
+
+# A caption frame is four layers: background, description band (top), answer band (bottom) and
+# caption band (middle). The first three only change when the answer is revealed or the puzzle
+# changes, so they are composited once into a cached base and each segment only draws its caption.
+
+_lock = threading.Lock()
+_bases = OrderedDict()
+_stats = {'base_hits': 0, 'base_misses': 0}
+
+def draw_description(image, description, font_path, font_size=70, padding=50, extra_space=100, stroke_width=2):
+    img_size = image.size
+    static_font_size = int(font_size * 0.8)  # Slightly smaller font for static text
+    static_font = asset_cache.get_font(font_path, static_font_size)
+    max_static_width = img_size[0] - (2 * padding) - (2 * extra_space)
+
+    # Wrap the static text
+    wrapped_static_text, static_widths = text_layout.wrap(description, static_font, max_static_width)
+    static_y = padding
+
+    # Draw the white static text with its black border at the top
+    for i, line in enumerate(wrapped_static_text):
+        static_x = (img_size[0] - static_widths[i]) / 2  # Center the text horizontally
+        text_render.draw_line(image, (static_x, static_y + i * (static_font_size + 10)), line, static_font, stroke_width)
+
+def draw_answer(image, answer, font_path, font_size=70, padding=50, extra_space=100, stroke_width=2, type='text'):
+    img_size = image.size
+    bottom_font_size = int(font_size * (0.8  if type != 'chess' else 1))
+    bottom_font = asset_cache.get_font(font_path, bottom_font_size)
+    img_start_size = img_size[0] if type != 'chess' else ((img_size[0]-img_size[1])/2)
+    max_bottom_width = img_start_size - (2 * padding) - (2 * extra_space)
+
+    # Wrap the bottom static text with the prefix
+    local_answer = f"Answer is :: {answer}" if type != 'chess' else answer
+    wrapped_bottom_text, bottom_widths = text_layout.wrap(local_answer, bottom_font, max_bottom_width)
+
+    # Calculate y-position for the bottom static text
+    total_bottom_height = len(wrapped_bottom_text) * (bottom_font_size + 10)
+    bottom_y = img_size[1] - total_bottom_height - padding
+
+    # Draw the white bottom static text with its black border
+    for i, line in enumerate(wrapped_bottom_text):
+        bottom_x = (img_start_size - bottom_widths[i]) / 2  # Center the text horizontally
+        text_render.draw_line(image, (bottom_x, bottom_y + i * (bottom_font_size + 10)), line, bottom_font, stroke_width)
+
+def draw_caption(image, text, font_path, font_size=70, padding=50, extra_space=100, stroke_width=2):
+    img_size = image.size
+    font = asset_cache.get_font(font_path, font_size)
+    max_text_width = img_size[0] - (2 * padding) - (2 * extra_space)
+    wrapped_text, _ = text_layout.wrap(text, font, max_text_width)
+
+    total_height = len(wrapped_text) * (font_size + 10)
+    x = (img_size[0] - (img_size[0] - (2 * padding) - (2 * extra_space))) / 2
+    y = (img_size[1] - total_height) / 2
+
+    # Draw the white bold text with a black border around each letter
+    for i, line in enumerate(wrapped_text):
+        text_render.draw_line(image, (x + extra_space, y + i * (font_size + 10)), line, font, stroke_width)
+
+def base_layer(background_path, font_path, description="", answer="", font_size=70, padding=50, extra_space=100, stroke_width=2, img_size=(1920, 1080), type='text'):
+    """Background with its description and answer bands, cached per distinct content. Do not draw on the result."""
+    key = (background_path, os.path.getmtime(background_path), font_path, description, answer, font_size, padding, extra_space, stroke_width, tuple(img_size), type)
+    with _lock:
+        base = _bases.get(key)
+        if base is not None:
+            _bases.move_to_end(key)
+            _stats['base_hits'] += 1
+            return base
+        _stats['base_misses'] += 1
+
+    base = asset_cache.get_background(background_path, img_size)
+    if description:
+        draw_description(base, description, font_path, font_size, padding, extra_space, stroke_width)
+    if answer:
+        draw_answer(base, answer, font_path, font_size, padding, extra_space, stroke_width, type)
+    logger_config.info(f"Base layer rendered for background: {background_path}")
+
+    with _lock:
+        _bases[key] = base
+        while len(_bases) > custom_env.BASE_LAYER_CACHE_N:
+            _bases.popitem(last=False)
+    return base
+
+def compose(text, background_path, font_path, description="", answer="", font_size=70, padding=50, extra_space=100, stroke_width=2, img_size=(1920, 1080), type='text'):
+    """Full frame: a copy of the cached base with only the caption band drawn on it."""
+    image = base_layer(background_path, font_path, description, answer, font_size, padding, extra_space, stroke_width, img_size, type).copy()
+    if text:
+        draw_caption(image, text, font_path, font_size, padding, extra_space, stroke_width)
+    return image
+
+def get_stats():
+    return dict(_stats, bases=len(_bases))
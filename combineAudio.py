@@ -7,7 +7,7 @@ def start(file_names, path=None):
 
     # Loop through the file names and append them to the combined audio
     for file_name in file_names:
-        audio = AudioSegment.from_wav(file_name)
+        audio = AudioSegment.from_file(file_name)
         combined += audio
 
     # Export the combined audio to a new WAV file
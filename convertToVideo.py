@@ -1,8 +1,10 @@
 import whisper
 from moviepy.editor import *
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 import os
 import time
+import json
+from concurrent.futures import ThreadPoolExecutor
 import random
 import sqlite3
 import riddle_parser
@@ -13,7 +15,17 @@ import retrieveText
 import databasecon
 import common
 import custom_env
-import resize_image
+import preflight
+import transcript_index
+import narration_archive
+import asset_cache
+import caption_layers
+import slide_encoder
+import video_timeline
+import render_pool
+import render_profiles
+import thumbnails
+import subtitles
 
 BACKGROUND_IMAGES_N = 11  # Total number of background images available
 BACKGROUND_LABEL = 'background'
@@ -24,8 +36,11 @@ FONT_LABEL = 'font'
 FONT_PATH = 'Fonts'
 FONT_EXT = 'ttf'
 SHOW_ANSWER = False
-TEMP_FILENAME = 'temp_text_image.png'
+DEBUG_FRAMES_PATH = 'debug_frames'
 IMAGE_SIZE=(1920, 1080)
+FACTS_MAX_DURATION = 30
+# Caption sizes at a profile's native resolution, scaled for drafts
+CAPTION_LAYOUT = dict(font_size=70, padding=50, extra_space=100, stroke_width=2)
 
 def get_random_file_name(path, label, n, ext, type=''):
     """Select a random background image from the available ones."""
@@ -41,224 +56,137 @@ def get_random_file_name(path, label, n, ext, type=''):
         logger_config.error(f"Error selecting background image: {str(e)}")
         return ""
 
-def find_segment_time(sentence, segments, type, checkAfterSegment):
-    sentence = sentence.strip().lower()  # Normalize the sentence for better matching
-    sentence = sentence.replace(".", "")
-    sendNextWordStartTime = False
-    combineSegementText = None
-    for i, segment in enumerate(segments):
-        if checkAfterSegment is None or segment["id"] >= checkAfterSegment["id"]:
-            segment_text = segment['text'].strip().lower()
-            segment_text = segment_text.replace(".", "")
-            if combineSegementText is None:
-                combineSegementText = segment_text
-            else:
-                combineSegementText += f" {segment_text}"
-            if sendNextWordStartTime:
-                return segment
-            if sentence in combineSegementText:
-                if type == "start":
-                    return segment
-                else:
-                    if i == len(segments) - 1:
-                        return segment
-                    sendNextWordStartTime = True
+def find_segment_time(sentence, segments, type, checkAfterSegment, index=None):
+    index = index or transcript_index.TranscriptIndex(segments)
+    first = 0 if checkAfterSegment is None else index.position_of(checkAfterSegment)
+    i = index.find_segment(sentence, first)
+    if i is None:
+        return None
+
+    if type == "start" or i == len(segments) - 1:
+        return segments[i]
+    # For "end" markers the segment after the matched sentence is returned
+    return segments[i + 1]
+
+def save_debug_frame(frame):
+    if not custom_env.DEBUG_SAVE_FRAMES:
+        return
+    common.create_directory(DEBUG_FRAMES_PATH)
+    debug_path = os.path.join(DEBUG_FRAMES_PATH, f"{os.getpid()}-{time.time_ns()}.png")
+    Image.fromarray(frame).save(debug_path)
+    logger_config.info(f"Debug frame saved to {debug_path}")
+
+def write_video(slides, audio, audio_path, output_path, profile):
+    """Encode (frame, start, duration) slides over the narration with the custom_env.VIDEO_BACKEND encoder."""
+    if custom_env.VIDEO_BACKEND == 'slides':
+        slide_encoder.write(slides, audio_path, output_path, profile['fps'], duration=audio.duration, chunks=custom_env.ENCODE_CHUNKS, **render_profiles.slide_params(profile))
+        return output_path
+
+    logger_config.info(f"Combining audio {len(slides)}")
+    # Combine subtitle clips and audio into a single video
+    timeline = video_timeline.Timeline(slides)
+    logger_config.info(f"Combining audio Done, {len(timeline.intervals)} intervals")
+    video = timeline.to_clip().set_audio(audio)  # Use trimmed audio here
+    video.write_videofile(output_path, **render_profiles.moviepy_params(profile))
+    return output_path
+
+def plan(id, audio_path=None, startWith = None, puzzle_start_w_title=None):
+    """Transcribe, find the markers and lay out every slide. Returns the job both draft and final renders are made from, or None."""
+    logger_config.info(f"Processing audio:: {audio_path}")
+    if common.file_exists(audio_path) is False:
+        return None
 
-    return None
+    result = databasecon.execute("SELECT thumbnailText, description, answer, type FROM entries WHERE id = ?", (id,), type='get')
 
-def create_text_image(text, background_path, temp_filename, font_path, font_size=70, padding=50, extra_space=100, stroke_width=2, description="", answer="", img_size=IMAGE_SIZE, type='text'):
-    logger_config.info(f"Creating text image with background: {background_path}")
-    try:
-        background = Image.open(background_path).resize(img_size)
-        draw = ImageDraw.Draw(background)
-
-        # Function to wrap text into lines based on the width
-        def wrap_text(text, font, max_width):
-            wrapped_lines = []
-            lines = text.splitlines()
-            
-            for line in lines:
-                words = line.split()
-                current_line = ""
-                for word in words:
-                    test_line = f"{current_line} {word}".strip()
-                    bbox = draw.textbbox((0, 0), test_line, font=font)
-                    line_width = bbox[2] - bbox[0]
-                    if line_width <= max_width:
-                        current_line = test_line
-                    else:
-                        wrapped_lines.append(current_line)
-                        current_line = word
-                wrapped_lines.append(current_line)
-            return wrapped_lines
-
-        # Draw static text at the top
-        if description:
-            static_font_size = int(font_size * 0.8)  # Slightly smaller font for static text
-            static_font = ImageFont.truetype(font_path, static_font_size)
-            max_static_width = img_size[0] - (2 * padding) - (2 * extra_space)
-
-            # Wrap the static text
-            wrapped_static_text = wrap_text(description, static_font, max_static_width)
-            
-            # Calculate y-position for the static text
-            total_static_height = len(wrapped_static_text) * (static_font_size + 10)
-            static_y = padding
-            
-            # Draw the black border (stroke) for the static text at the top
-            for i, line in enumerate(wrapped_static_text):
-                text_width = draw.textbbox((0, 0), line, font=static_font)[2] - draw.textbbox((0, 0), line, font=static_font)[0]
-                static_x = (img_size[0] - text_width) / 2  # Center the text horizontally
-                
-                for dx in range(-stroke_width, stroke_width + 1):
-                    for dy in range(-stroke_width, stroke_width + 1):
-                        if dx != 0 or dy != 0:
-                            draw.text((static_x + dx, static_y + i * (static_font_size + 10) + dy), line, font=static_font, fill="black")
-            
-            # Draw the white static text on top of the black stroke
-            for i, line in enumerate(wrapped_static_text):
-                text_width = draw.textbbox((0, 0), line, font=static_font)[2] - draw.textbbox((0, 0), line, font=static_font)[0]
-                static_x = (img_size[0] - text_width) / 2  # Center the text horizontally
-                draw.text((static_x, static_y + i * (static_font_size + 10)), line, font=static_font, fill="white")
-
-        # Draw static text at the bottom
-        if answer:
-            bottom_font_size = int(font_size * (0.8  if type != 'chess' else 1))
-            bottom_font = ImageFont.truetype(font_path, bottom_font_size)
-            img_start_size = img_size[0] if type != 'chess' else ((img_size[0]-img_size[1])/2)
-            max_bottom_width = img_start_size - (2 * padding) - (2 * extra_space)
-
-            # Wrap the bottom static text with the prefix
-            local_answer = f"Answer is :: {answer}" if type != 'chess' else answer
-            wrapped_bottom_text = wrap_text(local_answer, bottom_font, max_bottom_width)
-
-            # Calculate y-position for the bottom static text
-            total_bottom_height = len(wrapped_bottom_text) * (bottom_font_size + 10)
-            bottom_y = img_size[1] - total_bottom_height - padding
-
-            # Draw the black border for bottom static text
-            for i, line in enumerate(wrapped_bottom_text):
-                text_width = draw.textbbox((0, 0), line, font=bottom_font)[2] - draw.textbbox((0, 0), line, font=bottom_font)[0]
-                bottom_x = (img_start_size - text_width) / 2  # Center the text horizontally
-                
-                for dx in range(-stroke_width, stroke_width + 1):
-                    for dy in range(-stroke_width, stroke_width + 1):
-                        if dx != 0 or dy != 0:
-                            draw.text((bottom_x + dx, bottom_y + i * (bottom_font_size + 10) + dy), line, font=bottom_font, fill="black")
-
-            # Draw the white bottom static text on top of the black stroke
-            for i, line in enumerate(wrapped_bottom_text):
-                text_width = draw.textbbox((0, 0), line, font=bottom_font)[2] - draw.textbbox((0, 0), line, font=bottom_font)[0]
-                bottom_x = (img_start_size - text_width) / 2  # Center the text horizontally
-                draw.text((bottom_x, bottom_y + i * (bottom_font_size + 10)), line, font=bottom_font, fill="white")
-
-        # Process the main text
-        if text:
-            font = ImageFont.truetype(font_path, font_size)
-            max_text_width = img_size[0] - (2 * padding) - (2 * extra_space)
-            wrapped_text = wrap_text(text, font, max_text_width)
-
-            total_height = len(wrapped_text) * (font_size + 10)
-            x = (img_size[0] - (img_size[0] - (2 * padding) - (2 * extra_space))) / 2
-            y = (img_size[1] - total_height) / 2
-
-            # Draw the black border for each letter of dynamic text
-            for i, line in enumerate(wrapped_text):
-                for dx in range(-stroke_width, stroke_width + 1):
-                    for dy in range(-stroke_width, stroke_width + 1):
-                        if dx != 0 or dy != 0:
-                            draw.text((x + extra_space + dx, y + i * (font_size + 10) + dy), line, font=font, fill="black")
-
-            # Draw the white bold text on top of the black stroke
-            for i, line in enumerate(wrapped_text):
-                draw.text((x + extra_space, y + i * (font_size + 10)), line, font=font, fill="white")
-
-        # Save the image
-        background.save(temp_filename)
-        logger_config.info(f"Text image created and saved to {temp_filename}")
-        return temp_filename
-    except Exception as e:
-        logger_config.error(f"Error creating text image: {str(e)}")
-        return ""
+    thumbnailText, description, answer, type = result if result else ("", "", "", "")
+
+    # Reject wrong openings and over-long facts before paying for a full transcription
+    if not preflight.check(audio_path, startWith, FACTS_MAX_DURATION if type == 'facts' else None):
+        return None
 
-def process(id, audio_path=None, startWith = None, puzzle_start_w_title=None):
-    logger_config.info(f"Processing audio:: {audio_path}")
-    if common.file_exists(audio_path) is False:
-        return False
     transcript, segments = retrieveText.parse(audio_path)
     if not transcript:
         logger_config.error("No transcript generated. Cannot create video.")
-        return False
+        return None
     
     if startWith and not transcript.strip().startswith(startWith):
         logger_config.error(f"Generated transcript from NotebookLLM is not correct. Try again... {transcript} ::: {startWith}")
         logger_config.error(f"index:: {transcript.index(startWith)}")
-        return False
-
-    result = databasecon.execute("SELECT thumbnailText, description, answer, type FROM entries WHERE id = ?", (id,), type='get')
-
-    thumbnailText, description, answer, type = result if result else ("", "", "", "")
+        return None
 
+    narration_text = transcript
     transcript = riddle_parser.process_convo_text(transcript, description, answer)
     if transcript is None:
         logger_config.error("No transcript generated. Cannot create video.")
-        return False
+        return None
     
     highlighted_transcript = transcript.replace('--#start#--', '\033[1;32m--#start#--\033[0m') \
                                         .replace('--#end#--', '\033[1;31m--#end#--\033[0m') \
                                         .replace('--#answer#--', '\033[1;34m--#answer#--\033[0m')
     logger_config.info(f"Parsed transcript: {highlighted_transcript}")
 
-    # Extract file name for output
-    output_filename = f"{common.generate_random_string()}.mp4"
-
     # Load background image
     background_path = get_random_file_name(BACKGROUND_PATH, BACKGROUND_LABEL, BACKGROUND_IMAGES_N, BACKGROUND_EXT, type)
     audio = AudioFileClip(audio_path)
 
-    if audio.duration > 30 and type == 'facts':
+    if audio.duration > FACTS_MAX_DURATION and type == 'facts':
         logger_config.error(f"facts cannot be more than 60 sec: {audio.duration}")
-        return False
+        return None
 
     # Split transcript into sentences and calculate total words
     sentences = transcript.split('. ')
+    index = transcript_index.TranscriptIndex(segments)
     start_segment = None
     end_segment = None
     show_ans_segment = None
+    answer_sentence = None
 
     for sentence in sentences:
         if "--#start#--" in sentence:
             sentence = sentence.replace("--#start#--", "")
-            start_segment = find_segment_time(sentence, segments, "start", None)
+            start_segment = find_segment_time(sentence, segments, "start", None, index)
         
         if "--#end#--" in sentence:
             sentence = sentence.replace("--#end#--", "")
-            end_segment = find_segment_time(sentence, segments, "end", show_ans_segment)
+            end_segment = find_segment_time(sentence, segments, "end", show_ans_segment, index)
 
         if "--#answer#--" in sentence:
             sentence = sentence.replace("--#answer#--", "")
-            show_ans_segment = find_segment_time(sentence, segments, "start", start_segment)
-
-    start_show_answer = show_ans_segment['start'] if show_ans_segment and 'start' in show_ans_segment else audio.duration / 2
+            answer_sentence = sentence
+            show_ans_segment = find_segment_time(sentence, segments, "start", start_segment, index)
+
+    start_show_answer = audio.duration / 2
+    if show_ans_segment:
+        start_show_answer = show_ans_segment['start']
+        first = index.position_of(start_segment) if start_segment else 0
+        match = index.find(answer_sentence, first)
+        if match:
+            # Only the segment the answer sentence starts in gets the word-level alignment pass,
+            # so the reveal lands on its first word instead of waiting for the segment start
+            position = index.segment_at(match[0])
+            retrieveText.refine_words(audio_path, [segments[position]])
+            index = transcript_index.TranscriptIndex(segments)
+            # Without word times that line up with the segment's tokens, find_time would fall back to the
+            # bounds of that segment and could reveal the answer while the question is still being asked
+            answer_time = index.find_time(answer_sentence, first) if index.aligned[position] else None
+            if answer_time:
+                start_show_answer = answer_time[0]
+        logger_config.info(f"Answer revealed at {start_show_answer:.2f}s")
+    elif type == 'text':
+        logger_config.error("Answer marker not found in the transcript. Cannot create video.")
+        return None
     # end_time = segments[-1]['end']
 
     font_path = get_random_file_name(FONT_PATH, FONT_LABEL, FONT_N, FONT_EXT)
-    txt_clips = []
+    slides = []
     if type == 'chess':
-        temp_image_path = create_text_image(
-            '',
-            background_path,
-            TEMP_FILENAME,
-            font_path,
-            answer=f'Answer at {start_show_answer}s',
-            type='chess'
-        )
-
-        clip = ImageClip(temp_image_path).set_duration(start_show_answer).set_start(0)
-        txt_clips.append(clip)
-        os.remove(temp_image_path)
+        slides.append(dict(
+            layout=dict(text='', background_path=background_path, font_path=font_path, answer=f'Answer at {start_show_answer}s', type='chess'),
+            start=0,
+            duration=start_show_answer
+        ))
 
-        logger_config.info(f"Clip created for file {temp_image_path} start at 0")
+        logger_config.info(f"Clip created for file {background_path} start at 0")
 
         logger_config.info(f"Getting Chess move files...")
         files = common.list_files_recursive(custom_env.CHESS_MOVES_PATH)
@@ -275,20 +203,13 @@ def process(id, audio_path=None, startWith = None, puzzle_start_w_title=None):
                 file_in_order = [file for file in filtered_files if file.endswith(f'new_chess_board-update-{i}-{j}.jpg')]
                 
                 if file_in_order:
-                    temp_image_path = create_text_image(
-                        '',
-                        file_in_order[0],
-                        TEMP_FILENAME,
-                        font_path,
-                        answer=f'Answer at {start_show_answer}s',
-                        type='chess'
-                    )
-
-                    clip = ImageClip(temp_image_path).set_duration(move_duration).set_start(start_show_answer + secondCount)
-                    txt_clips.append(clip)
-                    os.remove(temp_image_path)
-
-                    logger_config.info(f"Clip created for file {temp_image_path} start at {start_show_answer}")
+                    slides.append(dict(
+                        layout=dict(text='', background_path=file_in_order[0], font_path=font_path, answer=f'Answer at {start_show_answer}s', type='chess'),
+                        start=start_show_answer + secondCount,
+                        duration=move_duration
+                    ))
+
+                    logger_config.info(f"Clip created for file {file_in_order[0]} start at {start_show_answer}")
                     secondCount += move_duration  # Increment for the next clip duration
                 else:
                     can_break = True
@@ -300,19 +221,24 @@ def process(id, audio_path=None, startWith = None, puzzle_start_w_title=None):
         final_desc = ''
         final_answer = ''
         puzzle_count = 0
+        next_puzzle_hits = set(index.segments_with('next puzzle'))
+        answer_is_hits = set(index.segments_with('answer is'))
+        answer_hits = {}
         for i, segment in enumerate(segments):
             try:
                 if type == 'text':
                     final_desc = description
-                    if segment["start"] >= show_ans_segment["start"]:
+                    if segment["start"] >= start_show_answer:
                         final_answer = answer
                 elif puzzle_start_w_title and type == 'long_form_text':
-                    if puzzle_count < len(puzzle_start_w_title) and (i == 0 or 'next puzzle'.lower() in segment["text"].lower()):
+                    if puzzle_count < len(puzzle_start_w_title) and (i == 0 or i in next_puzzle_hits):
                         background_path_change = True
                         final_desc = puzzle_start_w_title[puzzle_count]['description']
                         final_answer = ''
                         logger_config.success(f"final_desc:: {final_desc}, answer {final_answer} start:: {puzzle_start_w_title[puzzle_count]['start']}, end:: {puzzle_start_w_title[puzzle_count]['end']}")
-                    if puzzle_count < len(puzzle_start_w_title) and ('answer is'.lower() in segment["text"].lower() or puzzle_start_w_title[puzzle_count]['answer'].lower() in segment["text"].lower()):
+                    if puzzle_count < len(puzzle_start_w_title) and puzzle_count not in answer_hits:
+                        answer_hits[puzzle_count] = set(index.segments_with(puzzle_start_w_title[puzzle_count]['answer']))
+                    if puzzle_count < len(puzzle_start_w_title) and (i in answer_is_hits or i in answer_hits[puzzle_count]):
                         final_answer = puzzle_start_w_title[puzzle_count]['answer']
                         logger_config.success(f"final_desc:: {final_desc}, answer {final_answer} start:: {puzzle_start_w_title[puzzle_count]['start']}, end:: {puzzle_start_w_title[puzzle_count]['end']}")
                         puzzle_count += 1
@@ -325,75 +251,164 @@ def process(id, audio_path=None, startWith = None, puzzle_start_w_title=None):
                     background_path_change = False
                     background_path = get_random_file_name(BACKGROUND_PATH, BACKGROUND_LABEL, BACKGROUND_IMAGES_N, BACKGROUND_EXT, type)
 
-                temp_image_path = create_text_image(
-                    segment["text"], 
-                    background_path,
-                    TEMP_FILENAME,
-                    font_path,
-                    description=final_desc,
-                    answer=final_answer,
-                    img_size=IMAGE_SIZE[::-1] if type == "facts" else IMAGE_SIZE
-                )
                 if i < len(segments) - 1:
                     duration = round(segments[i + 1]["end"] - segment["start"], 2)
                 else:
                     duration = round(segment["end"] - segment["start"], 2)
 
-                clip = ImageClip(temp_image_path).set_duration(duration).set_start(segment["start"])
-                txt_clips.append(clip)
-
-                os.remove(temp_image_path)
-                logger_config.info(f"Created text:{segment['text']} clip for time range: {segment['start']} - {segment['end']} duration: {duration}")
+                layout = dict(text=segment["text"], background_path=background_path, font_path=font_path, description=final_desc, answer=final_answer)
+                if type == 'text' and not final_answer and segment["start"] < start_show_answer < segment["start"] + duration:
+                    # The answer is revealed part way through this caption
+                    slides.append(dict(layout=layout, start=segment["start"], duration=round(start_show_answer - segment["start"], 2)))
+                    slides.append(dict(
+                        layout=dict(layout, answer=answer),
+                        start=start_show_answer,
+                        duration=round(segment["start"] + duration - start_show_answer, 2)
+                    ))
+                    continue
+
+                slides.append(dict(
+                    layout=layout,
+                    start=segment["start"],
+                    duration=duration
+                ))
 
             except Exception as e:
                 logger_config.error(f"Error creating text clip: {str(e)}")
-        
-        if not txt_clips:
+
+        if not slides:
             logger_config.error("No text clips could be created. Cannot generate video.")
-            return False
-    
-    logger_config.info(f"Combining audio {len(txt_clips)}")
-    # Combine subtitle clips and audio into a single video
-    subtitles_clip = CompositeVideoClip(txt_clips)
-    logger_config.info(f"Combining audio Done")
-    video = CompositeVideoClip([subtitles_clip.set_audio(audio)])  # Use trimmed audio here
+            return None
+
+    return {
+        'id': id,
+        'type': type,
+        'audio_path': audio_path,
+        'duration': audio.duration,
+        'thumbnailText': thumbnailText,
+        'background_path': background_path,
+        'font_path': font_path,
+        'narration_text': narration_text,
+        'segments': segments,
+        'markers': {'start': start_segment, 'answer': show_ans_segment, 'end': end_segment},
+        'puzzle_start_w_title': puzzle_start_w_title,
+        'slides': slides,
+    }
+
+def save_job(job, job_path=None):
+    common.create_directory(custom_env.RENDER_JOBS_PATH)
+    job_path = job_path or os.path.join(custom_env.RENDER_JOBS_PATH, f"{job['id']}-{common.generate_random_string()}.json")
+    with open(job_path, 'w') as f:
+        json.dump(job, f, default=float)
+    logger_config.info(f"Render job saved:: {job_path}")
+    return job_path
+
+def load_job(job_path):
+    with open(job_path) as f:
+        return json.load(f)
+
+def uses_soft_captions(type):
+    # Chess has no spoken captions to move into a track
+    return type in custom_env.SOFT_CAPTION_TYPES and type != 'chess'
+
+def background_states(slides):
+    """The slides without their caption text, with runs of identical background/description/answer merged."""
+    states = []
+    for slide in slides:
+        layout = dict(slide['layout'], text='')
+        end = slide['start'] + slide['duration']
+        if states and states[-1]['layout'] == layout:
+            states[-1]['duration'] = max(end, states[-1]['start'] + states[-1]['duration']) - states[-1]['start']
+        else:
+            states.append(dict(slide, layout=layout))
+    return states
+
+def render(job, profile, output_path, soft_captions=False):
+    """Rasterize the job's slides at the profile's size and encode them. Returns the encode time, or None.
+    With soft_captions only the distinct caption-less states are rendered and the text is muxed as a subtitle track."""
+    scale = profile['scale']
+    sizes = {key: round(value * scale) for key, value in CAPTION_LAYOUT.items()}
+    sizes['stroke_width'] = max(1, sizes['stroke_width'])
+    job_slides = background_states(job['slides']) if soft_captions else job['slides']
+    jobs = [dict(slide['layout'], img_size=profile['resolution'], **sizes) for slide in job_slides]
+
+    # Layouts are planned in order by plan(); only the rasterizing is fanned out
+    slides = []
+    for slide, frame in zip(job_slides, render_pool.render(jobs)):
+        if frame is None:
+            continue
+        save_debug_frame(frame)
+        slides.append((frame, slide['start'], slide['duration']))
+        logger_config.info(f"Created clip:{slide['layout']['text'] or slide['layout']['background_path']} start: {slide['start']} duration: {slide['duration']}")
+
+    if not slides:
+        logger_config.error("No text clips could be created. Cannot generate video.")
+        return None
+
+    asset_cache.log_stats()
+    logger_config.info(f"Caption layers:: {caption_layers.get_stats()}")
+    logger_config.info(f"Rendering video: {output_path} with {profile}")
+    render_start = time.time()
+    write_video(slides, AudioFileClip(job['audio_path']), job['audio_path'], output_path, profile)
+    if soft_captions:
+        subtitles.attach(job['slides'], output_path, custom_env.SUBTITLE_FORMAT)
+    logger_config.info(f"Video saved as {output_path}")
+    return time.time() - render_start
+
+def ensure_columns():
+    thumbnails.ensure_columns()
+    subtitles.ensure_columns()
+    render_profiles.ensure_columns()
+
+def render_targets(job, targets, soft_captions=False):
+    """Render one planned job to several (profile, output_path) targets concurrently. They share the plan and the
+    in-process font, glyph, layout and background caches. Returns each target's encode time, None where it failed."""
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        return list(executor.map(lambda target: render(job, *target, soft_captions), targets))
+
+def finish(job, render_overrides=None):
+    """Final render of a planned job, then thumbnail, database updates and narration archiving."""
+    id = job['id']
+    type = job['type']
+    audio_path = job['audio_path']
+    puzzle_start_w_title = job['puzzle_start_w_title']
 
-    # Output video file
+    # Extract file name for output
+    output_filename = f"{common.generate_random_string()}.mp4"
     output_path = os.path.join("video", output_filename)
-    logger_config.info(f"Rendering video: {output_path}")
-    video.write_videofile(output_path, fps=custom_env.FPS)
-    logger_config.info(f"Video saved as {output_path}")
+    profile = render_profiles.get(type, **(render_overrides or {}))
+    soft_captions = uses_soft_captions(type)
+    targets = [(profile, output_path)]
+    vertical_path = None
+    if type in custom_env.VERTICAL_TARGET_TYPES:
+        vertical_path = f"{os.path.splitext(output_path)[0]}-vertical.mp4"
+        targets.append((render_profiles.vertical(type, **(render_overrides or {})), vertical_path))
+    seconds = render_targets(job, targets, soft_captions)
+    if seconds[0] is None:
+        return False
+    vertical = None
+    if vertical_path and seconds[1] is None:
+        logger_config.error(f"Vertical render failed, keeping only {output_path}")
+        vertical_path = None
+    elif vertical_path:
+        vertical = (targets[1][0], seconds[1], vertical_path)
+    render_profiles.record(id, profile, seconds[0], output_path, vertical)
+    subtitle_path = f"{os.path.splitext(output_path)[0]}.{custom_env.SUBTITLE_FORMAT}" if soft_captions else None
     
-    # Generate and save the thumbnail
-    thumbnail_filename = f"{os.path.splitext(output_filename)[0]}-thumbnail.png"
-    thumbnail_path = os.path.join("video", thumbnail_filename)
+    # Thumbnails reuse the cached background and layouts from the render above
+    thumbnail_base = os.path.join("video", os.path.splitext(output_filename)[0])
+    thumbnail_path, x_thumbnail_path = f"{thumbnail_base}-thumbnail.png", f"{thumbnail_base}-thumbnail-x.jpg"
     try:
-        if type == 'chess':
-            background = Image.open(background_path).resize(IMAGE_SIZE)
-            # Save the image
-            background.save(thumbnail_path)
-        else:
-            create_text_image(
-                '' if type == 'facts' else thumbnailText, 
-                background_path,
-                thumbnail_path,
-                font_path,
-                font_size=140,
-                img_size=IMAGE_SIZE[::-1] if type == "facts" else IMAGE_SIZE
-            )
-
-        logger_config.info(f"Thumbnail created: {thumbnail_path}")
+        thumbnails.write(job, IMAGE_SIZE[::-1] if type == "facts" else IMAGE_SIZE, thumbnail_path, x_thumbnail_path)
     except Exception as e:
         logger_config.error(f"Error generating thumbnail: {str(e)}")
-    
-    # Resize the thumbnail
-    resize_image.start(thumbnail_path)
-    
+
+    ensure_columns()
     databasecon.execute("""
             UPDATE entries 
-            SET generatedVideoPath = ?, generatedThumbnailPath = ?
+            SET generatedVideoPath = ?, generatedThumbnailPath = ?, generatedXThumbnailPath = ?, generatedSubtitlePath = ?, generatedVerticalVideoPath = ?
             WHERE id = ?
-        """, (output_path, thumbnail_path, id))
+        """, (output_path, thumbnail_path, x_thumbnail_path, subtitle_path, vertical_path, id))
     
     if puzzle_start_w_title and type == 'long_form_text':
         for details in puzzle_start_w_title:
@@ -403,8 +418,51 @@ def process(id, audio_path=None, startWith = None, puzzle_start_w_title=None):
                 WHERE id = ?
             """, (id, details['id']))
     
+    if type == 'text':
+        # Long form reuses text puzzles; keep their narration instead of decoding it back out of the video
+        narration_archive.archive(id, audio_path, job['narration_text'], job['segments'])
+
     common.remove_file(audio_path)
     return True
 
+def process(id, audio_path=None, startWith = None, puzzle_start_w_title=None, render_overrides=None):
+    job = plan(id, audio_path, startWith, puzzle_start_w_title)
+    if job is None:
+        return False
+    return finish(job, render_overrides)
+
+def draft(id, audio_path=None, startWith = None, puzzle_start_w_title=None, render_overrides=None):
+    """Plan the video and render a quick low resolution preview to check the markers, answer reveal and caption timing.
+    Returns the job file; promote() renders the final video from it without transcribing again."""
+    job = plan(id, audio_path, startWith, puzzle_start_w_title)
+    if job is None:
+        return None
+    job_path = save_job(job)
+
+    profile = render_profiles.draft(job['type'], **(render_overrides or {}))
+    output_path = f"{os.path.splitext(job_path)[0]}-draft.mp4"
+    seconds = render(job, profile, output_path, uses_soft_captions(job['type']))
+    if seconds is None:
+        return None
+    job['draft'] = dict(profile, path=output_path, seconds=round(seconds, 2))
+    save_job(job, job_path)
+    logger_config.success(f"Draft rendered:: {output_path}")
+    return job_path
+
+def promote(job_path, render_overrides=None):
+    """Final render from a draft job's layouts and timeline."""
+    job = load_job(job_path)
+    if common.file_exists(job['audio_path']) is False:
+        logger_config.error(f"Narration for job {job_path} is gone: {job['audio_path']}")
+        return False
+    if not finish(job, render_overrides):
+        return False
+    if 'draft' in job:
+        common.remove_file(job['draft']['path'])
+        if uses_soft_captions(job['type']):
+            common.remove_file(f"{os.path.splitext(job['draft']['path'])[0]}.{custom_env.SUBTITLE_FORMAT}")
+    common.remove_file(job_path)
+    return True
+
 # if __name__ == "__main__":
 #     process(120, '/home/jebineinstein/git/CaptionCreator/audio/sample.wav')
\ No newline at end of file
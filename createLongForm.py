@@ -7,17 +7,23 @@ import common
 from moviepy.editor import VideoFileClip, AudioFileClip, CompositeAudioClip, concatenate_audioclips
 import retrieveAudio
 import trimaudio
+import preflight
+import narration_archive
+import transcriber
 from typing import List, Tuple, Optional
 import numpy as np
 import combineAudio
 import random
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 START_WITH = ['Hello everyone', 'Hello', 'everyone']
 END_WITH = ['Thank you for listening', 'Thanks for listening', 'for listening']
 
 def get_valid_entries(limit: int = 100) -> List[Tuple[str]]:
-    return databasecon.execute(f"""SELECT id, description, answer, generatedVideoPath FROM entries WHERE type ='text'
+    narration_archive.ensure_columns()
+    return databasecon.execute(f"""SELECT id, description, answer, generatedVideoPath, narrationPath, narrationTimelinePath FROM entries WHERE type ='text'
         AND (addedToLongForm is NULL OR addedToLongForm = '')
         AND generatedVideoPath is not NULL
         AND generatedVideoPath != ''
@@ -35,35 +41,120 @@ def process_audio_file(file_path: str) -> Optional[str]:
         logger_config.error(f"Error processing audio file {file_path}: {str(e)}")
         return None
 
-def process_video_entry(video_path: str, skipEnd: bool = False) -> Optional[str]:
+def discard_audio(path: str):
+    # Archived narrations are owned by narration_archive's retention, never by a single long form
+    if not narration_archive.is_archived(path):
+        common.remove_file(path)
+
+def has_start_text(transcript: str) -> bool:
+    for text in START_WITH:
+        if transcript.strip().lower().startswith(text.lower()):
+            return True
+    return False
+
+def prepare_video_entry(video_path: str) -> Optional[Tuple[str, list]]:
+    """Extract, transcribe and validate one candidate. Safe to run in a worker process."""
     try:
         if not common.file_exists(video_path):
             logger_config.error(f'Video path does not exist: {video_path}')
             return None
 
         path = retrieveAudio.get(video_path)
+        if not preflight.check(path, START_WITH):
+            common.remove_file(path)
+            return None
+
         transcript, segments = retrieveText.parse(path)
         
-        hasStartText = False
-        for text in START_WITH:
-            if transcript.strip().lower().startswith(text.lower()):
-                hasStartText = True
-                break
-        
-        if not hasStartText:
+        if not has_start_text(transcript):
             logger_config.error(f"Not valid transcript")
+            common.remove_file(path)
             return None
-        
+
+        return path, segments
+            
+    except Exception as e:
+        logger_config.error(f"Error processing video {video_path}: {str(e)}")
+        return None
+
+def prepare_archived_entry(narration_path: str, timeline_path: str) -> Optional[Tuple[str, list]]:
+    """Read the narration and timeline archived at render time: no video decode and no transcription."""
+    try:
+        transcript, segments = narration_archive.load_timeline(timeline_path)
+        if not has_start_text(transcript):
+            logger_config.error(f"Not valid transcript")
+            return None
+        return narration_path, segments
+    except Exception as e:
+        logger_config.error(f"Error reading archived narration {narration_path}: {str(e)}")
+        return None
+
+def prepare_entry(entry: Tuple[str]) -> Optional[Tuple[str, list]]:
+    id, description, answer, video_path, narration_path, timeline_path = entry
+    if narration_path and common.file_exists(narration_path) and common.file_exists(timeline_path):
+        return prepare_archived_entry(narration_path, timeline_path)
+    return prepare_video_entry(video_path)
+
+def finish_video_entry(path: str, segments: list, skipEnd: bool = False) -> Optional[str]:
+    try:
         if segments:
             trimmed_path = trimaudio.get(path, fromText=START_WITH, endText=None if skipEnd else END_WITH, segments=segments)
+            if trimmed_path:
+                discard_audio(path)
             return process_audio_file(trimmed_path)
         else:
             return process_audio_file(path)
             
     except Exception as e:
-        logger_config.error(f"Error processing video {video_path}: {str(e)}")
+        logger_config.error(f"Error trimming audio {path}: {str(e)}")
         return None
 
+def process_video_entry(video_path: str, skipEnd: bool = False) -> Optional[str]:
+    prepared = prepare_video_entry(video_path)
+    if prepared is None:
+        return None
+    return finish_video_entry(*prepared, skipEnd=skipEnd)
+
+def collect_clips(entries: List[Tuple[str]], max_audio_count: int) -> List[Tuple[Tuple[str], str]]:
+    """Prepare candidates speculatively on a process pool, accept them in id order and
+    cancel whatever is still outstanding once max_audio_count clips are accepted."""
+    clips = []
+    consumed = 0
+    workers = custom_env.LONG_FORM_WORKERS
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=transcriber.limit_threads,
+        initargs=(workers,)
+    )
+    futures = [executor.submit(prepare_entry, entry) for entry in entries]
+    try:
+        for entry, future in zip(entries, futures):
+            consumed += 1
+            logger_config.warning(f"Trying for video:: {len(clips) + 1} :: {entry[3]} :: totl itr :: {consumed}")
+
+            prepared = future.result()
+            if prepared is None:
+                logger_config.error(f"audio_path none continue...")
+                continue
+
+            audio_path = finish_video_entry(*prepared, skipEnd=(len(clips) + 1 == max_audio_count))
+            if audio_path is None:
+                logger_config.error(f"audio_path none continue...")
+                continue
+
+            clips.append((entry, audio_path))
+            if len(clips) == max_audio_count:
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        # Candidates that finished speculatively but were not needed leave an extracted wav behind
+        for future in futures[consumed:]:
+            if not future.cancelled() and future.exception() is None and future.result():
+                discard_audio(future.result()[0])
+
+    return clips
+
 def save_to_database(audio_path: str, puzzle_start_w_title='') -> Tuple[int, str]:
     databasecon.execute(
         """DELETE FROM entries
@@ -97,46 +188,28 @@ def start() -> bool:
         # Initialize audio components
         audio_clips = ['background_music/hello.wav']
         next_puzzle = "background_music/next_puzzle.wav"
-        processed_count = 1
-        itr_count = 0
         max_audio_count = 10
 
         puzzle_start_w_title = []
 
-        # Process videos and collect audio
-        for entry in entries:
-            itr_count += 1
-            if processed_count > max_audio_count:  # Process 3 videos (1 initial + 2 additional)
-                break
-
-            id, description, answer, video_path = entry
-            logger_config.warning(f"Trying for video:: {processed_count} :: {video_path} :: totl itr :: {itr_count}")
-
-            # Process video entry
-            audio_path = process_video_entry(video_path, skipEnd=(processed_count==max_audio_count))
-
-            if audio_path is None:
-                logger_config.error(f"audio_path none continue...")
-                continue
-
-            # Handle first clip differently
-            if audio_path:
-                audio_clips.append(audio_path)
-                audio = AudioFileClip(audio_path)
-                start = 0 if len(puzzle_start_w_title) == 0 else puzzle_start_w_title[-1]['end'] + 4
-                puzzle_start_w_title.append({
-                    "id": id,
-                    "start": start,
-                    "end": audio.duration,
-                    "description": description,
-                    'answer': answer
-                })
-                logger_config.warning(puzzle_start_w_title)
-                if processed_count < max_audio_count:
-                    audio_clips.append(next_puzzle)
-
-                processed_count += 1
-                continue
+        # Process videos in parallel and collect audio in id order
+        clips = collect_clips(entries, max_audio_count)
+        for i, (entry, audio_path) in enumerate(clips):
+            id, description, answer = entry[:3]
+
+            audio_clips.append(audio_path)
+            audio = AudioFileClip(audio_path)
+            start = 0 if len(puzzle_start_w_title) == 0 else puzzle_start_w_title[-1]['end'] + 4
+            puzzle_start_w_title.append({
+                "id": id,
+                "start": start,
+                "end": audio.duration,
+                "description": description,
+                'answer': answer
+            })
+            logger_config.warning(puzzle_start_w_title)
+            if i < max_audio_count - 1:
+                audio_clips.append(next_puzzle)
         
         # Combine audio clips
         final_path = f'audio/{common.generate_random_string()}.wav'
@@ -145,13 +218,13 @@ def start() -> bool:
             final_path = combineAudio.start(audio_clips, final_path)
             for file in audio_clips:
                 if 'hello' not in file and 'next_puzzle' not in file:
-                    common.remove_file(file)
+                    discard_audio(file)
             logger_config.success(f'final combining audioPath:: {final_path}')
         except Exception as e:
             logger_config.error(f"Error combining audio: {str(e)}")
             return False
 
-        if processed_count < max_audio_count:
+        if len(clips) < max_audio_count:
             logger_config.warning("No required amount of video found after processing")
             return False
 
@@ -159,6 +232,8 @@ def start() -> bool:
             entry_id, audio_path = save_to_database(final_path, json.dumps(puzzle_start_w_title))
             is_success = convertToVideo.process(entry_id, audio_path=audio_path, puzzle_start_w_title=puzzle_start_w_title)
             common.update_database_status(entry_id, is_success)
+            if is_success:
+                narration_archive.enforce_retention()
             return is_success
         except Exception as e:
             logger_config.error(f"Error in database operations: {str(e)}")
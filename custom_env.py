@@ -11,4 +11,47 @@ CHESS_BOARD_JPG = f'{CHESS_PATH}/chess_board.jpg'
 CHESS_BOARD_WITH_PUZZLE_SVG = f'{CHESS_PATH}/chess_board_with_puzzle.svg'
 CHESS_BOARD_WITH_PUZZLE_JPG = f'{CHESS_PATH}/chess_board_with_puzzle.jpg'
 CHESS_MOVES_PATH = f'{CHESS_PATH}/moves'
-FPS=24
\ No newline at end of file
+FPS=24
+
+WHISPER_MODEL = 'base'
+# Set to ('localhost', 6001) to send transcription jobs to a running `python3 transcriber.py` service
+TRANSCRIBER_ADDRESS = None
+TRANSCRIBER_AUTHKEY = b'CaptionCreator'
+TRANSCRIPT_CACHE_PATH = 'ContentData/transcript_cache.db'
+TRANSCRIPT_CACHE_MAX_BYTES = 200 * 1024 * 1024
+LONG_FORM_WORKERS = 4
+# Audio longer than this is split at silences and transcribed on TRANSCRIBE_WORKERS processes
+WINDOWED_TRANSCRIBE_MIN_SECONDS = 180
+WINDOW_SECONDS = 60
+WINDOW_OVERLAP_SECONDS = 2
+TRANSCRIBE_WORKERS = 4
+# 'tiered' transcribes segments only and aligns words around the caption markers; 'full' aligns every word
+TRANSCRIBE_MODE = 'tiered'
+ALIGN_PAD_SECONDS = 0.5
+NARRATION_ARCHIVE_PATH = 'narration'
+NARRATION_ARCHIVE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+ASSET_CACHE_MAX_BYTES = 512 * 1024 * 1024
+ASSET_CACHE_MAX_FONTS = 32
+TEXT_RENDER_CACHE_MAX_BYTES = 128 * 1024 * 1024
+# Also write every caption frame to debug_frames/ (frames are otherwise handed to moviepy in memory)
+DEBUG_SAVE_FRAMES = False
+BASE_LAYER_CACHE_N = 16
+# 'moviepy' composites every frame; 'slides' writes each distinct caption once and lets ffmpeg hold it
+VIDEO_BACKEND = 'moviepy'
+# Processes rasterizing caption frames; 1 renders them in the main process
+RENDER_WORKERS = 1
+# With VIDEO_BACKEND = 'slides', encode the timeline as this many frame-aligned chunks in parallel
+ENCODE_CHUNKS = 1
+# Per content type encode settings layered over render_profiles.PROFILES, e.g. {'long_form_text': {'crf': 26}}
+RENDER_PROFILE_OVERRIDES = {}
+# Draft renders (convertToVideo.draft) run at this fraction of the profile resolution and this frame rate
+DRAFT_SCALE = 1 / 3
+DRAFT_FPS = 12
+RENDER_JOBS_PATH = 'render_jobs'
+# Content types rendered with captions as a mov_text subtitle track over caption-less frames instead of burned in
+SOFT_CAPTION_TYPES = []
+SUBTITLE_FORMAT = 'srt'
+YOUTUBE_UPLOAD_CAPTIONS = True
+# Content types that also get a 9:16 copy rendered from the same plan, e.g. ['text']. publish_to_yt uploads
+# the copy as a Short linking to the main video, unless the entry has its own facts short under the same title
+VERTICAL_TARGET_TYPES = []
@@ -31,6 +31,13 @@ def execute(query, values=None, type='getAll'):
             conn.commit()
             conn.close()
 
+def ensure_column(table, column, definition):
+    """Add a column to an existing database that was created before the column existed."""
+    columns = execute(f"PRAGMA table_info({table})") or []
+    if column not in [info[1] for info in columns]:
+        logger_config.info(f"Adding column {column} to {table}")
+        execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
 # if __name__ == "__main__":
 #     # Correctly format the execute call with proper type
 #     results = execute("get", "SELECT audioPath FROM entries WHERE generatedVideoPath IS NULL OR generatedVideoPath = ''")
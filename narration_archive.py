@@ -0,0 +1,79 @@
+import os
+import json
+from pydub import AudioSegment
+import common
+import custom_env
+import databasecon
+import logger_config
+
+def ensure_columns():
+    databasecon.ensure_column('entries', 'narrationPath', 'TEXT')
+    databasecon.ensure_column('entries', 'narrationTimelinePath', 'TEXT')
+
+def is_archived(path):
+    archive_dir = os.path.abspath(custom_env.NARRATION_ARCHIVE_PATH)
+    return bool(path) and os.path.abspath(path).startswith(archive_dir + os.sep)
+
+def archive(entry_id, audio_path, transcript, segments):
+    """Keep the narration as FLAC plus its segment timeline, so long-form assembly never has to decode the rendered video."""
+    try:
+        ensure_columns()
+        common.create_directory(custom_env.NARRATION_ARCHIVE_PATH)
+        narration_path = os.path.join(custom_env.NARRATION_ARCHIVE_PATH, f"{entry_id}.flac")
+        timeline_path = os.path.join(custom_env.NARRATION_ARCHIVE_PATH, f"{entry_id}.json")
+
+        AudioSegment.from_file(audio_path).export(narration_path, format='flac')
+        with open(timeline_path, 'w') as f:
+            json.dump({'text': transcript, 'segments': segments}, f, default=float)
+
+        databasecon.execute("""
+            UPDATE entries 
+            SET narrationPath = ?, narrationTimelinePath = ?
+            WHERE id = ?
+        """, (narration_path, timeline_path, entry_id))
+        logger_config.success(f"Narration archived:: {narration_path}")
+
+        enforce_retention()
+        return narration_path
+    except Exception as e:
+        logger_config.error(f"Error archiving narration for {entry_id}: {str(e)}")
+        return None
+
+def load_timeline(timeline_path):
+    with open(timeline_path) as f:
+        timeline = json.load(f)
+    return timeline['text'], timeline['segments']
+
+def remove(entry_id, narration_path, timeline_path):
+    common.remove_file(narration_path)
+    common.remove_file(timeline_path)
+    databasecon.execute("""
+        UPDATE entries 
+        SET narrationPath = NULL, narrationTimelinePath = NULL
+        WHERE id = ?
+    """, (entry_id,))
+
+def enforce_retention():
+    """Drop archives already used in a long form, then the oldest ones until the archive fits NARRATION_ARCHIVE_MAX_BYTES."""
+    try:
+        ensure_columns()
+        rows = databasecon.execute("""
+            SELECT id, narrationPath, narrationTimelinePath, addedToLongForm FROM entries
+            WHERE narrationPath IS NOT NULL AND narrationPath != ''
+            ORDER BY id desc
+        """) or []
+
+        total = 0
+        for entry_id, narration_path, timeline_path, added_to_long_form in rows:
+            if added_to_long_form or not common.file_exists(narration_path):
+                remove(entry_id, narration_path, timeline_path)
+                continue
+
+            total += os.path.getsize(narration_path)
+            if common.file_exists(timeline_path):
+                total += os.path.getsize(timeline_path)
+            if total > custom_env.NARRATION_ARCHIVE_MAX_BYTES:
+                logger_config.info(f"Narration archive over {custom_env.NARRATION_ARCHIVE_MAX_BYTES} bytes, removing {narration_path}")
+                remove(entry_id, narration_path, timeline_path)
+    except Exception as e:
+        logger_config.error(f"Error enforcing narration retention: {str(e)}")
@@ -0,0 +1,55 @@
+import re
+import time
+import wave
+from moviepy.editor import AudioFileClip
+import logger_config
+import transcriber
+
+HEAD_SECONDS = 6
+
+def get_duration(audio_path):
+    """Read the duration from the WAV header, only decoding when the file is not a plain WAV."""
+    try:
+        with wave.open(audio_path, 'rb') as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError):
+        audio = AudioFileClip(audio_path)
+        duration = audio.duration
+        audio.close()
+        return duration
+
+def _normalize(text):
+    text = re.sub(r"[^\w\s]", "", text.lower())
+    return " ".join(text.split())
+
+def starts_with(audio_path, phrases, seconds=HEAD_SECONDS):
+    text = transcriber.transcribe_span(audio_path, 0, seconds)['text']
+    opening = _normalize(text)
+    for phrase in phrases:
+        if opening.startswith(_normalize(phrase)):
+            return True
+
+    logger_config.error(f"Narration does not start with any of {phrases}: {text}")
+    return False
+
+def check(audio_path, start_with=None, max_duration=None):
+    """Cheap validation before a full transcription: duration from the header, opening phrase from the first seconds."""
+    started = time.time()
+    try:
+        if max_duration is not None:
+            duration = get_duration(audio_path)
+            if duration > max_duration:
+                logger_config.error(f"Audio is {duration:.1f}s, more than the allowed {max_duration}s: {audio_path}")
+                return False
+
+        if start_with:
+            phrases = [start_with] if isinstance(start_with, str) else start_with
+            if not starts_with(audio_path, phrases):
+                return False
+
+        logger_config.info(f"Preflight passed for {audio_path} in {time.time() - started:.2f}s")
+        return True
+    except Exception as e:
+        # A preflight that cannot run should not block the full pass, which validates again
+        logger_config.warning(f"Preflight skipped for {audio_path}: {str(e)}")
+        return True
@@ -7,6 +7,7 @@ import custom_env
 import logger_config
 import common
 import databasecon
+import thumbnails
 
 # Load Twitter API credentials from xcredentials.json
 with open('xcredentials.json', 'r') as file:
@@ -243,8 +244,9 @@ def post_to_x(title, video_path, thumbnail_path, description, type):
 
 def process_entries_in_db():
     logger_config.info("Fetching entries ready for Twitter posting.")
+    thumbnails.ensure_columns()
     entries = databasecon.execute(f""" 
-        SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, youtubeVideoId, type 
+        SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, youtubeVideoId, type, generatedXThumbnailPath 
         FROM entries 
         WHERE generatedThumbnailPath IS NOT NULL 
         AND (uploadedToX = 0 OR uploadedToX IS NULL)
@@ -256,14 +258,15 @@ def process_entries_in_db():
 
     # Post to X (after all uploads are complete)
     for entry in entries:
-        entry_id, title, description, video_path, thumbnail_path, youtubeVideoId, type = entry
+        entry_id, title, description, video_path, thumbnail_path, youtubeVideoId, type, x_thumbnail_path = entry
         logger_config.info(f"Processing entry ID: {entry_id} for posting to Twitter.")
 
         # Post to X
         if type == '':
             description = 'Check out this video'
         youtube_link = f" https://www.youtube.com/watch?v={youtubeVideoId}" if youtubeVideoId else ""
-        tweet_id = post_to_x(title, video_path, thumbnail_path, str(description + youtube_link), type)
+        # Entries rendered before the X variant existed only have the YouTube thumbnail
+        tweet_id = post_to_x(title, video_path, x_thumbnail_path or thumbnail_path, str(description + youtube_link), type)
 
         # Mark the entry as posted to X
         logger_config.info(f"Marking entry ID: {entry_id} as posted to Twitter with tweet ID: {tweet_id}")
@@ -278,6 +281,8 @@ def process_entries_in_db():
 
         logger_config.info("Sleeping for 1 minute before processing the next entry.")
         common.remove_file(thumbnail_path)
+        if x_thumbnail_path:
+            common.remove_file(x_thumbnail_path)
         # common.remove_file(video_path)
 
     logger_config.info("Closing the database connection.")
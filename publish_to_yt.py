@@ -10,6 +10,8 @@ from google.auth.transport.requests import Request
 import custom_env
 import databasecon
 import common
+import subtitles
+import render_profiles
 
 import logger_config
 
@@ -74,7 +76,20 @@ def get_youtube_service(type='text'):
     logger_config.info("YouTube service built successfully.")
     return youtube_service
 
-def upload_video_to_youtube(video_path, thumbnail_path, title, description, type='text', riddle_shorts=False, old_video_id=None):
+def upload_captions(youtube, video_id, subtitle_path, language='en'):
+    """Attach a soft caption track (convertToVideo with SOFT_CAPTION_TYPES) to an uploaded video."""
+    try:
+        logger_config.info(f"Uploading captions: {subtitle_path}")
+        youtube.captions().insert(
+            part='snippet',
+            body={'snippet': {'videoId': video_id, 'language': language, 'name': 'English', 'isDraft': False}},
+            media_body=MediaFileUpload(subtitle_path)
+        ).execute()
+        logger_config.info(f"Captions uploaded successfully for video ID: {video_id}")
+    except Exception as e:
+        logger_config.error(f"An error occurred during caption upload: {e}")
+
+def upload_video_to_youtube(video_path, thumbnail_path, title, description, type='text', riddle_shorts=False, old_video_id=None, subtitle_path=None):
     """Upload a video to YouTube and set the thumbnail."""
     logger_config.info(f"Starting upload for video: {video_path}")
 
@@ -173,6 +188,9 @@ Logic riddles
     except Exception as e:
         logger_config.error(f"An error occurred during thumbnail upload: {e}")
 
+    if subtitle_path and custom_env.YOUTUBE_UPLOAD_CAPTIONS and os.path.isfile(subtitle_path):
+        upload_captions(youtube, video_id, subtitle_path)
+
     return video_id
 
 def process_entries_in_db(type):
@@ -192,6 +210,8 @@ def process_entries_in_db(type):
         logger_config.info(f"Will upload after 1 hrs :: {entries}")
         return
 
+    subtitles.ensure_columns()
+    render_profiles.ensure_columns()
     # Query for entries where generatedVideoPath and generatedThumbnailPath are not null
     logger_config.info("Fetching entries with videos and thumbnails ready for upload...")
     is_data_avail = False
@@ -202,7 +222,7 @@ def process_entries_in_db(type):
         date_contains = common.get_date(date_count)
         filter = f"AND title LIKE '%{date_contains}%'" if type == 'chess' else ''
         entries = databasecon.execute(f""" 
-            SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type
+            SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type, generatedSubtitlePath, generatedVerticalVideoPath
             FROM entries 
             WHERE (generatedVideoPath IS NOT NULL AND generatedVideoPath != '') 
             AND (generatedThumbnailPath IS NOT NULL AND generatedThumbnailPath != '')
@@ -218,7 +238,7 @@ def process_entries_in_db(type):
             title = entries[0][1]
             logger_config.info(f"Checking facts for title {title} entries to process.")
             entries = databasecon.execute(f""" 
-                SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type
+                SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type, generatedSubtitlePath, generatedVerticalVideoPath
                 FROM entries 
                 WHERE title = ?
             """, (title,))
@@ -229,14 +249,14 @@ def process_entries_in_db(type):
             title = entries[0][1]
             logger_config.info(f"Checking facts for title {title} entries to process.")
             entries = databasecon.execute(f""" 
-                SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type
+                SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type, generatedSubtitlePath, generatedVerticalVideoPath
                 FROM entries 
                 WHERE title = ? AND type = 'text'
             """, (title))
 
             if entries and len(entries) > 0:
                 entries = databasecon.execute(f""" 
-                    SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type
+                    SELECT id, title, description, generatedVideoPath, generatedThumbnailPath, type, generatedSubtitlePath, generatedVerticalVideoPath
                     FROM entries 
                     WHERE title != ? AND type = ?
                 """, (title, type))
@@ -248,11 +268,11 @@ def process_entries_in_db(type):
     # Upload videos to YouTube
     video_id = None
     for entry in entries:
-        entry_id, title, description, video_path, thumbnail_path, type = entry
+        entry_id, title, description, video_path, thumbnail_path, type, subtitle_path, vertical_path = entry
         logger_config.info(f"Processing entry {entry_id}: {title}")
 
         # Upload the video to YouTube
-        video_id = upload_video_to_youtube(video_path, thumbnail_path, title, description, type, riddle_shorts, video_id)
+        video_id = upload_video_to_youtube(video_path, thumbnail_path, title, description, type, riddle_shorts, video_id, subtitle_path)
         
         if not video_id:
             logger_config.error(f"Error uploading video for entry {entry_id}. Stopping further uploads.")
@@ -264,6 +284,14 @@ def process_entries_in_db(type):
         databasecon.execute("UPDATE entries SET uploadedToYoutube = ?, youtubeVideoId = ? WHERE id = ?", (current_timestamp_ms, video_id, entry_id,))
         logger_config.info(f"Entry {entry_id} successfully updated in the database.")
 
+        if vertical_path and os.path.isfile(vertical_path):
+            if riddle_shorts:
+                logger_config.info(f"Skipping the vertical copy of {entry_id}, the facts entry is this title's short")
+            else:
+                # The 9:16 copy rendered from the same plan goes out as the short, pointing at the main video
+                short_id = upload_video_to_youtube(vertical_path, thumbnail_path, title, description, 'facts', True, video_id, subtitle_path)
+                logger_config.info(f"Vertical copy of {entry_id} uploaded as short:: {short_id}")
+
         logger_config.info(f"========================================================")
         logger_config.info(f"=                                                      =")
         logger_config.info(f"=Entry {entry_id} successfully posted to YT            =")
@@ -0,0 +1,65 @@
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import asset_cache
+import caption_layers
+import custom_env
+import logger_config
+
+# Caption frames are independent once their layout (text, background, bands) is planned, so they
+# can be rasterized on every core. Each job is the keyword arguments of caption_layers.compose.
+WARM_BACKGROUNDS = 4
+
+def _init_worker(font_path, font_sizes, backgrounds):
+    # Load the fonts and the backgrounds many segments share up front instead of on each worker's first segment
+    for size in font_sizes:
+        asset_cache.get_font(font_path, size)
+    for background_path, img_size in backgrounds:
+        asset_cache.get_background(background_path, img_size)
+
+def render_job(job):
+    """RGB frame for one job, or (None, error) so one bad segment does not take down the batch."""
+    try:
+        image = caption_layers.compose(**job)
+        return np.asarray(image.convert('RGB')), None
+    except Exception as e:
+        return None, str(e)
+
+def _warm_args(jobs):
+    font_path = jobs[0]['font_path']
+    font_sizes = set()
+    for job in jobs:
+        font_size = job.get('font_size', 70)
+        font_sizes.update((font_size, int(font_size * 0.8)))
+    # One-off backgrounds (a chess board per move frame) are loaded on first use; warming them would decode
+    # every one in every worker and push most of them out of the cache before they are needed
+    counts = Counter((job['background_path'], tuple(job.get('img_size', (1920, 1080)))) for job in jobs)
+    backgrounds = [background for background, count in counts.most_common(WARM_BACKGROUNDS) if count > 1]
+    return font_path, sorted(font_sizes), sorted(backgrounds)
+
+def render(jobs, workers=None):
+    """Frames for jobs in job order; None where a job failed, with the error logged."""
+    workers = workers or custom_env.RENDER_WORKERS
+    if not jobs:
+        return []
+    if workers <= 1 or len(jobs) == 1:
+        results = [render_job(job) for job in jobs]
+    else:
+        workers = min(workers, len(jobs))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=_warm_args(jobs)
+        ) as executor:
+            # Neighbouring segments usually share a base layer, so hand them out in runs
+            results = list(executor.map(render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+        logger_config.info(f"Rendered {len(jobs)} caption frames on {workers} workers")
+
+    frames = []
+    for job, (frame, error) in zip(jobs, results):
+        if error is not None:
+            logger_config.error(f"Error creating text clip: {job.get('text')} :: {error}")
+        frames.append(frame)
+    return frames
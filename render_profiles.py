@@ -0,0 +1,137 @@
+import json
+import os
+import custom_env
+import databasecon
+import logger_config
+
+# Encode settings per content type. Tweak a channel with custom_env.RENDER_PROFILE_OVERRIDES,
+# e.g. {'long_form_text': {'crf': 26}}, or per run through process(..., render_overrides={...}).
+PROFILES = {
+    'text': {
+        'resolution': (1920, 1080),
+        'preset': 'medium',
+        'crf': 23,
+        'tune': 'stillimage',
+        'threads': None,
+        'audio_bitrate': '192k',
+        'pix_fmt': 'yuv420p',
+        'fps': custom_env.FPS,
+    },
+    'facts': {
+        'resolution': (1080, 1920),
+        'preset': 'medium',
+        'crf': 21,
+        'tune': 'stillimage',
+        'threads': None,
+        'audio_bitrate': '192k',
+        'pix_fmt': 'yuv420p',
+        'fps': custom_env.FPS,
+    },
+    'chess': {
+        'resolution': (1920, 1080),
+        'preset': 'medium',
+        'crf': 20,
+        # The move animation is real motion, so no still-image tuning
+        'tune': None,
+        'threads': None,
+        'audio_bitrate': '192k',
+        'pix_fmt': 'yuv420p',
+        'fps': custom_env.FPS,
+    },
+    'long_form_text': {
+        'resolution': (1920, 1080),
+        'preset': 'veryfast',
+        'crf': 25,
+        'tune': 'stillimage',
+        'threads': None,
+        'audio_bitrate': '160k',
+        'pix_fmt': 'yuv420p',
+        'fps': custom_env.FPS,
+    },
+}
+DEFAULT_PROFILE = 'text'
+
+def get(name, **overrides):
+    """Settings for profile `name` with custom_env.RENDER_PROFILE_OVERRIDES and then `overrides` applied."""
+    if name not in PROFILES:
+        logger_config.warning(f"No render profile for {name}, using {DEFAULT_PROFILE}")
+        name = DEFAULT_PROFILE
+    profile = dict(PROFILES[name])
+    profile.update(custom_env.RENDER_PROFILE_OVERRIDES.get(name, {}))
+    profile.update(overrides)
+    profile['resolution'] = tuple(profile['resolution'])
+    profile['name'] = name
+    # Caption layout is specified for the profile's own resolution and scaled with any override of it
+    profile['scale'] = min(size / base for size, base in zip(profile['resolution'], PROFILES[name]['resolution']))
+    return profile
+
+def _even(value):
+    # yuv420p needs even dimensions
+    return max(2, int(value) // 2 * 2)
+
+def draft(name, **overrides):
+    """Reduced resolution and frame rate, ultrafast variant of profile `name` for checking markers and caption timing."""
+    width, height = get(name)['resolution']
+    settings = {
+        'resolution': (_even(width * custom_env.DRAFT_SCALE), _even(height * custom_env.DRAFT_SCALE)),
+        'fps': custom_env.DRAFT_FPS,
+        'preset': 'ultrafast',
+        'crf': 30,
+        'audio_bitrate': '96k',
+    }
+    settings.update(overrides)
+    profile = get(name, **settings)
+    profile['draft'] = True
+    return profile
+
+def vertical(name, **overrides):
+    """Profile `name` turned to 9:16, for a portrait copy of a landscape video rendered from the same plan."""
+    width, height = get(name)['resolution']
+    profile = get(name, **dict({'resolution': (min(width, height), max(width, height))}, **overrides))
+    # Captions keep their native size on the narrow frame, as they do in the facts profile
+    base = sorted(PROFILES[profile['name']]['resolution'])
+    profile['scale'] = min(size / native for size, native in zip(profile['resolution'], base))
+    profile['vertical'] = True
+    return profile
+
+def moviepy_params(profile):
+    """Keyword arguments for VideoClip.write_videofile."""
+    ffmpeg_params = ['-crf', str(profile['crf']), '-pix_fmt', profile['pix_fmt']]
+    if profile['tune']:
+        ffmpeg_params += ['-tune', profile['tune']]
+    return {
+        'fps': profile['fps'],
+        'codec': 'libx264',
+        'preset': profile['preset'],
+        'threads': profile['threads'],
+        'audio_bitrate': profile['audio_bitrate'],
+        'ffmpeg_params': ffmpeg_params,
+    }
+
+def slide_params(profile):
+    """Keyword arguments for slide_encoder.write after its positional fps."""
+    return {key: profile[key] for key in ('preset', 'crf', 'tune', 'pix_fmt', 'threads', 'audio_bitrate')}
+
+def ensure_columns():
+    databasecon.ensure_column('entries', 'renderProfile', 'TEXT')
+    databasecon.ensure_column('entries', 'generatedVerticalVideoPath', 'TEXT')
+
+def _details(profile, seconds, output_path):
+    return dict(profile, backend=custom_env.VIDEO_BACKEND, seconds=round(seconds, 2), bytes=os.path.getsize(output_path))
+
+def record(entry_id, profile, seconds, output_path, vertical=None):
+    """Store the profile a video was encoded with, how long it took and what it weighs.
+    vertical is the (profile, seconds, output_path) of the 9:16 copy when one was rendered."""
+    try:
+        ensure_columns()
+        details = _details(profile, seconds, output_path)
+        if vertical:
+            details['vertical'] = _details(*vertical)
+        databasecon.execute("""
+            UPDATE entries
+            SET renderProfile = ?
+            WHERE id = ?
+        """, (json.dumps(details), entry_id))
+        logger_config.info(f"Render profile:: {details}")
+    except Exception as e:
+        logger_config.error(f"Error recording render profile for {entry_id}: {str(e)}")
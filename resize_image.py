@@ -1,33 +1,94 @@
 from moviepy.editor import *
 from PIL import Image
+import io
 import os
 import logger_config
 
-def start(thumbnail_path):
+MAX_FILE_SIZE = 2 * 1024 * 1024  # 2 MB
+MIN_JPEG_QUALITY = 40
+MIN_SCALE = 10  # percent
+
+def encode(img, format, **kwargs):
+    buffer = io.BytesIO()
+    img.save(buffer, format=format, **kwargs)
+    return buffer.getvalue()
+
+def _scaled(img, scale):
+    if scale == 100:
+        return img
+    return img.resize((max(1, img.width * scale // 100), max(1, img.height * scale // 100)), Image.LANCZOS)
+
+def _encode_at(img, format, level, scale):
+    # level is the JPEG quality or the PNG palette size; 257 means a full colour PNG
+    img = _scaled(img, scale)
+    if format == 'JPEG':
+        return encode(img.convert('RGB'), 'JPEG', quality=level, optimize=True)
+    if level > 256:
+        return encode(img, 'PNG', optimize=True)
+    return encode(img.convert('RGB').quantize(colors=level), 'PNG', optimize=True)
+
+def _search(lo, hi, encode_value, max_bytes, stats):
+    """Largest value in [lo, hi] whose encode fits max_bytes, assuming size grows with the value. Returns (value, data) or (None, None)."""
+    best = (None, None)
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        data = encode_value(mid)
+        stats['iterations'] += 1
+        if len(data) <= max_bytes:
+            best = (mid, data)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    return best
+
+def encode_to_size(img, max_bytes=MAX_FILE_SIZE, format='PNG'):
+    """Encode img in memory to fit max_bytes within a bounded number of encodes: binary search on JPEG
+    quality or PNG palette size first, then on scale at the lowest of those. Returns (data, details)."""
+    format = 'JPEG' if format.upper() in ('JPG', 'JPEG') else 'PNG'
+    stats = {'iterations': 0}
+    top = 95 if format == 'JPEG' else 257
+    bottom = MIN_JPEG_QUALITY if format == 'JPEG' else 2
+
+    data = _encode_at(img, format, top, 100)
+    stats['iterations'] += 1
+    level, scale = top, 100
+    if len(data) > max_bytes:
+        level, data = _search(bottom, top - 1, lambda value: _encode_at(img, format, value, 100), max_bytes, stats)
+        if level is None:
+            level = bottom
+            scale, data = _search(MIN_SCALE, 99, lambda value: _encode_at(img, format, bottom, value), max_bytes, stats)
+            if scale is None:
+                # Still over budget at the smallest size; return the smallest attempt rather than nothing
+                scale = MIN_SCALE
+                data = _encode_at(img, format, bottom, scale)
+                stats['iterations'] += 1
+
+    details = dict(stats, format=format, bytes=len(data), scale=scale)
+    details['quality' if format == 'JPEG' else 'colors'] = level if level <= 256 else 'full'
+    return data, details
+
+def start(thumbnail_path, max_file_size=MAX_FILE_SIZE, max_dimensions=None):
+    """Bring thumbnail_path under max_file_size, optionally shrinking it to fit max_dimensions first. The file is rewritten at most once."""
     logger_config.info(f"Checking thumbnail size: {thumbnail_path}")
-    max_file_size = 2 * 1024 * 1024  # 2 MB
     try:
-        img = Image.open(thumbnail_path)
         file_size = os.path.getsize(thumbnail_path)
         if file_size > max_file_size:
             logger_config.info(f"Resizing thumbnail {thumbnail_path}")
-            quality = 95
-            img = img.convert('P', palette=Image.ADAPTIVE)
-            img.save(thumbnail_path, format='PNG', optimize=True, quality=quality)
-            file_size = os.path.getsize(thumbnail_path)
-            while file_size > max_file_size:
-                img = Image.open(thumbnail_path)
-                img.save(thumbnail_path, format='PNG', optimize=True, quality=quality)
-                file_size = os.path.getsize(thumbnail_path)
-                quality -= 5
-                logger_config.info(f'for rezising image; {file_size} max_file_size: {max_file_size}', 10)
-            logger_config.info(f"Resized thumbnail to {file_size / 1024:.2f} KB with quality {quality}%")
+            img = Image.open(thumbnail_path)
+            img.load()
+            format = img.format or os.path.splitext(thumbnail_path)[1][1:]
+            if max_dimensions:
+                img.thumbnail(max_dimensions)
+            data, details = encode_to_size(img, max_file_size, format)
+            with open(thumbnail_path, 'wb') as f:
+                f.write(data)
+            logger_config.info(f"Resized thumbnail to {details['bytes'] / 1024:.2f} KB in {details['iterations']} encodes: {details}")
         else:
             logger_config.info(f"Thumbnail {thumbnail_path} is within size limits")
         return thumbnail_path
     except Exception as e:
         logger_config.error(f"Error resizing thumbnail: {str(e)}")
         return thumbnail_path
-    
+
 if __name__ == "__main__":
-    start("video/qGtcWu-thumbnail.png")
\ No newline at end of file
+    start("video/qGtcWu-thumbnail.png")
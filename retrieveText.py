@@ -1,15 +1,15 @@
 import logger_config
-import whisper
+import transcriber
+import custom_env
 
-def parse(audio_path):
+def parse(audio_path, word_timestamps=None):
     try:
         logger_config.info(f"Starting audio transcription for: {audio_path}")
+        if word_timestamps is None:
+            word_timestamps = custom_env.TRANSCRIBE_MODE == 'full'
 
-        # Load the Whisper model without weights_only parameter
-        model = whisper.load_model("base")
-        logger_config.info("Whisper model loaded successfully")
-
-        result = model.transcribe(audio_path, word_timestamps=True)
+        # The model stays resident in transcriber, so only the first call pays for loading it
+        result = transcriber.transcribe(audio_path, word_timestamps=word_timestamps)
         logger_config.info(f"Transcription completed successfully:")
         logger_config.info(f"{result['text']}")
         
@@ -18,5 +18,17 @@ def parse(audio_path):
         logger_config.error(f"Failed to transcribe audio {audio_path}: {str(e)}")
         return "", []
 
+def refine_words(audio_path, segments):
+    """Attach word timestamps to just these segments, for the places that need sub-segment timing."""
+    for segment in segments:
+        if segment is None or segment.get('words'):
+            continue
+        try:
+            segment['words'] = transcriber.align_words(audio_path, segment['start'], segment['end'])
+            logger_config.info(f"Aligned {len(segment['words'])} words for segment {segment['id']}: {segment['text']}")
+        except Exception as e:
+            logger_config.error(f"Failed to align words for segment {segment['id']}: {str(e)}")
+    return segments
+
 # if __name__ == "__main__":
 #     parse("audio/Untitled notebook.wav")
\ No newline at end of file
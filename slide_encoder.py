@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from moviepy.config import get_setting
+import logger_config
+import video_timeline
+
+# Caption videos are a few dozen still images held for seconds each. Instead of having moviepy
+# composite and pipe every one of the fps * duration frames, each distinct still is written once
+# and ffmpeg's concat demuxer holds it for its duration.
+
+def _frame_key(frame):
+    return hashlib.sha1(np.ascontiguousarray(frame).data).hexdigest()
+
+def write_stills(intervals, directory):
+    """Write each distinct frame of the intervals once. Returns (file name, start, end) per interval."""
+    first = next(frame for frame, _, _ in intervals if frame is not None)
+    black = np.zeros_like(first)
+    files = {}
+    stills = []
+    for frame, start, end in intervals:
+        frame = black if frame is None else frame
+        key = _frame_key(frame)
+        name = files.get(key)
+        if name is None:
+            name = files[key] = f"slide_{len(files):05d}.bmp"
+            Image.fromarray(frame).save(os.path.join(directory, name))
+        stills.append((name, start, end))
+    logger_config.info(f"Slides written: {len(intervals)} intervals, {len(files)} distinct frames")
+    return stills
+
+def write_concat_list(stills, list_path):
+    lines = ["ffconcat version 1.0"]
+    for name, start, end in stills:
+        lines.append(f"file '{name}'")
+        lines.append(f"duration {end - start:.6f}")
+    # The demuxer ignores the duration of the final entry, so the last still is listed once more
+    lines.append(f"file '{stills[-1][0]}'")
+    with open(list_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return list_path
+
+def clip_stills(stills, start, end):
+    """The part of the timeline between start and end, shifted to begin at 0."""
+    clipped = []
+    for name, still_start, still_end in stills:
+        if still_end <= start or still_start >= end:
+            continue
+        clipped.append((name, max(still_start, start) - start, min(still_end, end) - start))
+    return clipped
+
+def chunk_bounds(total, fps, chunks):
+    """Split [0, total) into up to `chunks` pieces whose edges fall exactly on frame boundaries."""
+    n_frames = max(1, round(total * fps))
+    chunks = max(1, min(chunks, n_frames))
+    edges = [round(n_frames * i / chunks) for i in range(chunks + 1)]
+    return [(a / fps, b / fps) for a, b in zip(edges, edges[1:]) if b > a]
+
+def video_args(fps, preset="medium", crf=23, tune="stillimage", pix_fmt="yuv420p", threads=None):
+    args = ["-vf", f"fps={fps}", "-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+    if tune:
+        args += ["-tune", tune]
+    args += ["-pix_fmt", pix_fmt]
+    if threads:
+        args += ["-threads", str(threads)]
+    return args
+
+def _encode_video(list_path, output_path, seconds, encode_args):
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-y", "-nostdin", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-an",
+        *encode_args,
+        "-t", f"{seconds:.6f}",
+        output_path
+    ]
+    subprocess.run(cmd, capture_output=True, check=True)
+    return output_path
+
+def _mux(list_path, audio_path, output_path, total, audio_bitrate, encode_args):
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-y", "-nostdin", "-loglevel", "error",
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", audio_path,
+        "-map", "0:v:0", "-map", "1:a:0",
+        *encode_args,
+        "-c:a", "aac", "-b:a", audio_bitrate,
+        "-t", f"{total:.6f}",
+        "-movflags", "+faststart",
+        output_path
+    ]
+    subprocess.run(cmd, capture_output=True, check=True)
+    return output_path
+
+def ffprobe_binary():
+    """ffprobe next to the ffmpeg moviepy uses, else one on PATH. None when there is neither (imageio-ffmpeg ships no ffprobe)."""
+    ffmpeg = get_setting("FFMPEG_BINARY")
+    directory, name = os.path.split(ffmpeg)
+    if directory and "ffmpeg" in name:
+        sibling = os.path.join(directory, name.replace("ffmpeg", "ffprobe"))
+        if os.path.isfile(sibling):
+            return sibling
+    return shutil.which("ffprobe")
+
+def _measure_stream(path, stream):
+    # Decode one stream to the null muxer and read the frame count and end time from the progress report
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-nostdin", "-v", "error", "-progress", "pipe:1",
+        "-i", path, "-map", f"0:{stream}:0", "-f", "null", "-"
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True, text=True).stdout
+    frames = re.findall(r"^frame=(\d+)", out, re.M)
+    times = re.findall(r"^out_time_us=(\d+)", out, re.M)
+    return int(frames[-1]) if frames else 0, int(times[-1]) / 1e6 if times else 0.0
+
+def probe_streams(path, fps):
+    """Duration and frame count of the video and audio streams, keyed by codec type."""
+    ffprobe = ffprobe_binary()
+    if ffprobe:
+        cmd = [ffprobe, "-v", "error", "-count_packets", "-show_entries", "stream=codec_type,duration,nb_read_packets", "-of", "json", path]
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+        streams = {stream['codec_type']: stream for stream in json.loads(out)['streams']}
+        return {
+            codec_type: {'duration': float(stream['duration']), 'nb_frames': int(stream['nb_read_packets'])}
+            for codec_type, stream in streams.items()
+        }
+
+    video_frames, _ = _measure_stream(path, "v")
+    audio_frames, audio_duration = _measure_stream(path, "a")
+    return {
+        'video': {'duration': video_frames / fps, 'nb_frames': video_frames},
+        'audio': {'duration': audio_duration, 'nb_frames': audio_frames},
+    }
+
+def check_sync(path, fps, total):
+    """Compare the encoded video and audio streams against the expected length; raises if they drift more than a frame."""
+    streams = probe_streams(path, fps)
+    video_duration = float(streams['video']['duration'])
+    audio_duration = float(streams['audio']['duration'])
+    tolerance = max(1 / fps, 0.05)
+    logger_config.info(f"Sync check {path}:: video {video_duration}s, audio {audio_duration}s, frames {streams['video']['nb_frames']}, expected {total}s")
+    if abs(video_duration - total) > tolerance or abs(audio_duration - video_duration) > tolerance:
+        raise RuntimeError(f"Audio/video out of sync in {path}: video {video_duration}s, audio {audio_duration}s, expected {total}s")
+    return True
+
+def write(slides, audio_path, output_path, fps, duration=None, preset="medium", crf=23, audio_bitrate="192k", chunks=1, tune="stillimage", pix_fmt="yuv420p", threads=None):
+    """Encode (frame, start, duration) slides over audio_path. duration defaults to the end of the last slide.
+    With chunks > 1 the timeline is split at frame boundaries, the pieces are encoded by parallel ffmpeg
+    processes, joined by stream copy and the audio is muxed once over the result."""
+    intervals = video_timeline.flatten(slides)
+    if not intervals:
+        raise ValueError("No slides to encode")
+    total = duration if duration is not None else intervals[-1][2]
+    if intervals[-1][2] < total:
+        intervals.append((intervals[-1][0], intervals[-1][2], total))
+
+    with tempfile.TemporaryDirectory() as directory:
+        stills = write_stills(intervals, directory)
+        bounds = chunk_bounds(total, fps, chunks)
+        if len(bounds) == 1:
+            list_path = write_concat_list(stills, os.path.join(directory, "slides.ffconcat"))
+            _mux(list_path, audio_path, output_path, total, audio_bitrate, video_args(fps, preset, crf, tune, pix_fmt, threads))
+            logger_config.info(f"Slides encoded to {output_path}")
+            return output_path
+
+        # Unless the profile pins threads, the cores are shared out between the chunk encoders
+        chunk_args = video_args(fps, preset, crf, tune, pix_fmt, threads or max(1, (os.cpu_count() or 1) // len(bounds)))
+        with ThreadPoolExecutor(max_workers=len(bounds)) as executor:
+            futures = []
+            for i, (start, end) in enumerate(bounds):
+                list_path = write_concat_list(clip_stills(stills, start, end), os.path.join(directory, f"chunk_{i:03d}.ffconcat"))
+                chunk_path = os.path.join(directory, f"chunk_{i:03d}.mp4")
+                futures.append(executor.submit(_encode_video, list_path, chunk_path, end - start, chunk_args))
+            chunk_paths = [future.result() for future in futures]
+        logger_config.info(f"Encoded {len(chunk_paths)} chunks in parallel")
+
+        join_path = os.path.join(directory, "chunks.ffconcat")
+        with open(join_path, "w") as f:
+            f.write("ffconcat version 1.0\n" + "".join(f"file '{os.path.basename(path)}'\n" for path in chunk_paths))
+        # Chunked encodes verify their sync before they are moved into place, so a failed check leaves nothing half published
+        joined_path = _mux(join_path, audio_path, os.path.join(directory, "joined.mp4"), total, audio_bitrate, ["-c:v", "copy"])
+        check_sync(joined_path, fps, total)
+        shutil.move(joined_path, output_path)
+
+    logger_config.info(f"Slides encoded to {output_path}")
+    return output_path
@@ -0,0 +1,68 @@
+import os
+import subprocess
+from moviepy.config import get_setting
+import databasecon
+import logger_config
+
+# Soft captions: the segment text goes out as a subtitle track instead of being burned into every
+# frame, so the video itself only needs the few distinct background/description/answer states.
+
+def ensure_columns():
+    databasecon.ensure_column('entries', 'generatedSubtitlePath', 'TEXT')
+
+def cues_from_slides(slides):
+    """(start, end, text) per caption slide, each ending where the next begins so cues never overlap."""
+    captions = [slide for slide in slides if slide['layout'].get('text', '').strip()]
+    cues = []
+    for i, slide in enumerate(captions):
+        end = slide['start'] + slide['duration']
+        if i < len(captions) - 1:
+            end = min(end, captions[i + 1]['start'])
+        if end > slide['start']:
+            cues.append((slide['start'], end, slide['layout']['text'].strip()))
+    return cues
+
+def _timestamp(seconds, separator):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def to_srt(cues):
+    blocks = [f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n" for i, (start, end, text) in enumerate(cues, 1)]
+    return "\n".join(blocks)
+
+def to_vtt(cues):
+    blocks = [f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}\n" for start, end, text in cues]
+    return "WEBVTT\n\n" + "\n".join(blocks)
+
+def write(cues, path):
+    """Write cues as WebVTT when path ends in .vtt, SRT otherwise."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(to_vtt(cues) if path.endswith('.vtt') else to_srt(cues))
+    logger_config.info(f"Subtitles written: {path} ({len(cues)} cues)")
+    return path
+
+def mux(video_path, subtitle_path, language='eng'):
+    """Add subtitle_path to video_path as a mov_text track, copying the existing streams."""
+    muxed_path = f"{os.path.splitext(video_path)[0]}-subtitled.mp4"
+    cmd = [
+        get_setting("FFMPEG_BINARY"), "-y", "-nostdin", "-loglevel", "error",
+        "-i", video_path, "-i", subtitle_path,
+        "-map", "0", "-map", "1:s:0",
+        "-c", "copy", "-c:s", "mov_text",
+        "-metadata:s:s:0", f"language={language}",
+        "-movflags", "+faststart",
+        muxed_path
+    ]
+    subprocess.run(cmd, capture_output=True, check=True)
+    os.replace(muxed_path, video_path)
+    return video_path
+
+def attach(slides, video_path, format='srt'):
+    """Write the caption track next to video_path and mux it in. Returns the subtitle path."""
+    subtitle_path = write(cues_from_slides(slides), f"{os.path.splitext(video_path)[0]}.{format}")
+    mux(video_path, subtitle_path)
+    logger_config.info(f"Soft captions muxed into {video_path}")
+    return subtitle_path
@@ -0,0 +1,74 @@
+import os
+import shutil
+import wave
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+pytest.importorskip("moviepy")
+from moviepy.config import get_setting
+import slide_encoder
+
+FPS = 24
+# Narrations are 44.1 kHz, so AAC frames are the same length as in production
+SAMPLE_RATE = 44100
+
+def _has_ffmpeg():
+    ffmpeg = get_setting("FFMPEG_BINARY")
+    return os.path.isfile(ffmpeg) or shutil.which(ffmpeg) is not None
+
+def _write_silence(path, seconds):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(bytes(2 * int(seconds * SAMPLE_RATE)))
+    return path
+
+def _slides():
+    # Durations that do not land on frame boundaries, so the chunk edges have to be rounded
+    colours = [(200, 30, 30), (30, 200, 30), (30, 30, 200), (200, 200, 30)]
+    durations = [1.3, 0.55, 2.07, 1.08]
+    slides = []
+    start = 0.0
+    for colour, duration in zip(colours, durations):
+        slides.append((np.full((48, 64, 3), colour, dtype=np.uint8), start, duration))
+        start += duration
+    return slides, start
+
+def test_chunk_bounds_fall_on_frame_boundaries():
+    bounds = slide_encoder.chunk_bounds(5.0, FPS, 4)
+    assert len(bounds) == 4
+    assert bounds[0][0] == 0
+    assert bounds[-1][1] == pytest.approx(5.0)
+    for (_, end), (start, _) in zip(bounds, bounds[1:]):
+        assert end == start
+    for start, end in bounds:
+        assert start * FPS == pytest.approx(round(start * FPS))
+        assert end * FPS == pytest.approx(round(end * FPS))
+
+def test_chunk_bounds_never_more_chunks_than_frames():
+    assert slide_encoder.chunk_bounds(2 / FPS, FPS, 4) == [(0, 1 / FPS), (1 / FPS, 2 / FPS)]
+
+def test_clip_stills_shifts_to_chunk_start():
+    stills = [('a.bmp', 0.0, 1.0), ('b.bmp', 1.0, 2.5), ('c.bmp', 2.5, 4.0)]
+    assert slide_encoder.clip_stills(stills, 0.75, 3.0) == [('a.bmp', 0.0, 0.25), ('b.bmp', 0.25, 1.75), ('c.bmp', 1.75, 2.25)]
+    assert slide_encoder.clip_stills(stills, 1.0, 2.5) == [('b.bmp', 0.0, 1.5)]
+
+@pytest.mark.skipif(not _has_ffmpeg(), reason="ffmpeg is not available")
+def test_chunked_encode_matches_single_encode(tmp_path):
+    slides, total = _slides()
+    audio_path = _write_silence(str(tmp_path / 'silence.wav'), total)
+
+    streams = {}
+    for chunks in (1, 4):
+        output_path = str(tmp_path / f'out-{chunks}.mp4')
+        slide_encoder.write(slides, audio_path, output_path, FPS, duration=total, preset='ultrafast', chunks=chunks)
+        streams[chunks] = slide_encoder.probe_streams(output_path, FPS)
+        assert slide_encoder.check_sync(output_path, FPS, total)
+
+    tolerance = 1 / FPS
+    assert streams[1]['video']['nb_frames'] == streams[4]['video']['nb_frames'] == round(total * FPS)
+    assert streams[4]['video']['duration'] == pytest.approx(streams[1]['video']['duration'], abs=tolerance)
+    assert streams[4]['audio']['duration'] == pytest.approx(streams[1]['audio']['duration'], abs=tolerance)
+    assert streams[4]['video']['duration'] == pytest.approx(total, abs=tolerance)
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+
+MAX_LAYOUTS = 4096
+
+_lock = threading.Lock()
+_advances = {}
+_kerning = {}
+_layouts = OrderedDict()
+_stats = {'layout_hits': 0, 'layout_misses': 0}
+
+def font_key(font):
+    return (font.path, font.size)
+
+def _tables(font):
+    key = font_key(font)
+    return _advances.setdefault(key, {}), _kerning.setdefault(key, {})
+
+def _advance(font, advances, char):
+    advance = advances.get(char)
+    if advance is None:
+        advance = advances[char] = font.getlength(char)
+    return advance
+
+def _kern(font, advances, kerning, left, right):
+    pair = left + right
+    kern = kerning.get(pair)
+    if kern is None:
+        kern = kerning[pair] = font.getlength(pair) - _advance(font, advances, left) - _advance(font, advances, right)
+    return kern
+
+def measure(font, text):
+    """Width of text built from cached glyph advances plus pair kerning, one table lookup per character."""
+    advances, kerning = _tables(font)
+    width = 0.0
+    previous = None
+    for char in text:
+        width += _advance(font, advances, char)
+        if previous is not None:
+            width += _kern(font, advances, kerning, previous, char)
+        previous = char
+    return width
+
+def _wrap(text, font, max_width):
+    advances, kerning = _tables(font)
+    space = _advance(font, advances, ' ')
+    lines = []
+    widths = []
+
+    for line in text.splitlines():
+        current = []
+        current_width = 0.0
+        for word in line.split():
+            word_width = measure(font, word)
+            if current:
+                # Joining adds the space plus the kerning on both of its sides
+                candidate = (current_width + space + word_width
+                             + _kern(font, advances, kerning, current[-1][-1], ' ')
+                             + _kern(font, advances, kerning, ' ', word[0]))
+            else:
+                candidate = word_width
+
+            if candidate <= max_width:
+                current.append(word)
+                current_width = candidate
+            else:
+                lines.append(" ".join(current))
+                widths.append(current_width)
+                current = [word]
+                current_width = word_width
+        lines.append(" ".join(current))
+        widths.append(current_width)
+
+    return tuple(lines), tuple(widths)
+
+def wrap(text, font, max_width):
+    """Greedy word wrap returning (lines, line widths), memoized by (text, font, size, max_width)."""
+    key = (text,) + font_key(font) + (max_width,)
+    with _lock:
+        layout = _layouts.get(key)
+        if layout is not None:
+            _layouts.move_to_end(key)
+            _stats['layout_hits'] += 1
+            return list(layout[0]), list(layout[1])
+        _stats['layout_misses'] += 1
+
+    layout = _wrap(text, font, max_width)
+    with _lock:
+        _layouts[key] = layout
+        while len(_layouts) > MAX_LAYOUTS:
+            _layouts.popitem(last=False)
+    return list(layout[0]), list(layout[1])
+
+def get_stats():
+    return dict(_stats, layouts=len(_layouts), fonts=len(_advances))
@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+import custom_env
+import text_layout
+
+_lock = threading.Lock()
+_lines = OrderedDict()
+_line_bytes = 0
+_stats = {'line_hits': 0, 'line_misses': 0}
+
+def _rasterize(line, font, stroke_width):
+    left, top, right, bottom = font.getbbox(line)
+    origin_x = stroke_width - min(0, left)
+    origin_y = stroke_width - min(0, top)
+    size = (max(1, right - min(0, left) + 2 * stroke_width), max(1, bottom - min(0, top) + 2 * stroke_width))
+
+    # One glyph pass; the outline is the same mask dilated by a (2 * stroke + 1) square, which is
+    # exactly the set of pixel offsets the stroke used to be drawn at
+    mask = Image.new('L', size, 0)
+    ImageDraw.Draw(mask).text((origin_x, origin_y), line, font=font, fill=255)
+    fill_alpha = np.asarray(mask, dtype=np.float32) / 255
+    if stroke_width:
+        stroke_alpha = np.asarray(mask.filter(ImageFilter.MaxFilter(2 * stroke_width + 1)), dtype=np.float32) / 255
+    else:
+        stroke_alpha = np.zeros_like(fill_alpha)
+
+    # White fill over black stroke folded into a single colour + alpha so it is blended once
+    alpha = fill_alpha + stroke_alpha * (1 - fill_alpha)
+    color = np.divide(fill_alpha, alpha, out=np.zeros_like(alpha), where=alpha > 0)
+    rgba = np.dstack([color, color, color, alpha]) * 255
+    return Image.fromarray(rgba.round().astype(np.uint8)), (origin_x, origin_y)
+
+def render_line(line, font, stroke_width=2):
+    """Outlined line bitmap and the offset of its text origin inside it, cached by (line, font, size, stroke)."""
+    global _line_bytes
+    key = (line,) + text_layout.font_key(font) + (stroke_width,)
+    with _lock:
+        rendered = _lines.get(key)
+        if rendered is not None:
+            _lines.move_to_end(key)
+            _stats['line_hits'] += 1
+            return rendered
+        _stats['line_misses'] += 1
+
+    rendered = _rasterize(line, font, stroke_width)
+    with _lock:
+        if key not in _lines:
+            _lines[key] = rendered
+            _line_bytes += rendered[0].width * rendered[0].height * 4
+        while _line_bytes > custom_env.TEXT_RENDER_CACHE_MAX_BYTES and len(_lines) > 1:
+            _, (evicted, _) = _lines.popitem(last=False)
+            _line_bytes -= evicted.width * evicted.height * 4
+    return rendered
+
+def draw_line(image, xy, line, font, stroke_width=2):
+    """Draw white text with a black outline at xy, the same anchor ImageDraw.text uses."""
+    if not line:
+        return
+    bitmap, (origin_x, origin_y) = render_line(line, font, stroke_width)
+    image.paste(bitmap, (round(xy[0]) - origin_x, round(xy[1]) - origin_y), bitmap)
+
+def get_stats():
+    return dict(_stats, lines=len(_lines), line_bytes=_line_bytes)
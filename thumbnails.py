@@ -0,0 +1,46 @@
+import asset_cache
+import caption_layers
+import databasecon
+import logger_config
+import resize_image
+
+# One thumbnail image is composed from the same cached background and layout engine as the
+# video frames, and each platform variant is encoded from it in memory and written once.
+YOUTUBE_MAX_BYTES = 2 * 1024 * 1024
+X_MAX_BYTES = 5 * 1024 * 1024
+X_MAX_SIZE = (1600, 1600)
+THUMBNAIL_FONT_SIZE = 140
+
+def ensure_columns():
+    databasecon.ensure_column('entries', 'generatedXThumbnailPath', 'TEXT')
+
+def compose(job, img_size):
+    if job['type'] == 'chess':
+        return asset_cache.get_background(job['background_path'], img_size)
+    text = '' if job['type'] == 'facts' else job['thumbnailText']
+    return caption_layers.compose(text, job['background_path'], job['font_path'], font_size=THUMBNAIL_FONT_SIZE, img_size=img_size)
+
+def encode_png(image, max_bytes=YOUTUBE_MAX_BYTES):
+    data, details = resize_image.encode_to_size(image, max_bytes, 'PNG')
+    logger_config.info(f"YouTube thumbnail encoded:: {details}")
+    return data
+
+def encode_jpeg(image, max_bytes=X_MAX_BYTES, max_size=X_MAX_SIZE):
+    image = image.copy()
+    image.thumbnail(max_size)
+    data, details = resize_image.encode_to_size(image, max_bytes, 'JPEG')
+    logger_config.info(f"X thumbnail encoded:: {details}")
+    return data
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+    logger_config.info(f"Thumbnail created: {path} ({len(data) / 1024:.2f} KB)")
+    return path
+
+def write(job, img_size, youtube_path, x_path):
+    """Compose the thumbnail for a planned job once and write its YouTube PNG and X JPEG."""
+    image = compose(job, img_size).convert('RGB')
+    _write(youtube_path, encode_png(image))
+    _write(x_path, encode_jpeg(image))
+    return youtube_path, x_path
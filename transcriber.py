@@ -0,0 +1,334 @@
+import os
+import time
+import queue
+import threading
+import subprocess
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.connection import Listener, Client
+import numpy as np
+import whisper
+import logger_config
+import custom_env
+import transcript_cache
+
+DEFAULT_ADDRESS = ('localhost', 6001)
+JOB_HISTORY_N = 50
+WINDOW_SEARCH_SECONDS = 10  # How far from the nominal window edge to look for silence
+SILENCE_FRAME_SECONDS = 0.1
+
+_model = None
+_model_name = None
+_model_lock = threading.Lock()
+_jobs = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+_window_pool = None
+_window_pool_model = None
+_stats = {
+    'model_load_time': 0.0,
+    'jobs_done': 0,
+    'jobs_failed': 0,
+    'history': deque(maxlen=JOB_HISTORY_N),
+}
+
+def get_model(name=None):
+    """Return the resident Whisper model, loading it on first use only."""
+    global _model, _model_name
+    name = name or custom_env.WHISPER_MODEL
+    with _model_lock:
+        if _model is None or _model_name != name:
+            logger_config.info(f"Loading Whisper model: {name}")
+            started = time.time()
+            _model = whisper.load_model(name)
+            _model_name = name
+            _stats['model_load_time'] = time.time() - started
+            logger_config.info(f"Whisper model loaded successfully in {_stats['model_load_time']:.2f}s")
+        return _model
+
+def queue_depth():
+    return _jobs.qsize()
+
+def get_stats():
+    history = list(_stats['history'])
+    return {
+        'model': _model_name,
+        'model_load_time': _stats['model_load_time'],
+        'queue_depth': queue_depth(),
+        'jobs_done': _stats['jobs_done'],
+        'jobs_failed': _stats['jobs_failed'],
+        'last_rtf': history[-1]['rtf'] if history else None,
+        'history': history,
+        'cache': transcript_cache.get_stats(),
+    }
+
+def load_audio_span(audio_path, start=0, seconds=None):
+    """Decode only part of a file to whisper-ready 16 kHz mono float32, seeking instead of decoding from the top."""
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-ss", str(start)]
+    if seconds is not None:
+        cmd += ["-t", str(seconds)]
+    cmd += [
+        "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+        "-ar", str(whisper.audio.SAMPLE_RATE),
+        "-"
+    ]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+def find_window_cuts(audio, window_seconds):
+    """Return sample offsets splitting audio into ~window_seconds pieces, each cut placed on the quietest frame near the nominal edge."""
+    sample_rate = whisper.audio.SAMPLE_RATE
+    frame = int(SILENCE_FRAME_SECONDS * sample_rate)
+    window = int(window_seconds * sample_rate)
+    search = int(WINDOW_SEARCH_SECONDS * sample_rate)
+
+    cuts = [0]
+    while len(audio) - cuts[-1] > window + search:
+        target = cuts[-1] + window
+        lo = max(cuts[-1] + frame, target - search)
+        hi = min(len(audio) - frame, target + search)
+        n_frames = (hi - lo) // frame
+        if n_frames < 1:
+            cuts.append(target)
+            continue
+        frames = audio[lo:lo + n_frames * frame].reshape(n_frames, frame)
+        rms = np.sqrt(np.mean(frames ** 2, axis=1))
+        quietest = int(np.argmin(rms))
+        cuts.append(lo + quietest * frame + frame // 2)
+    cuts.append(len(audio))
+    return cuts
+
+def limit_threads(workers):
+    """Give each of `workers` processes its share of the cores instead of letting torch use all of them."""
+    import torch
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+def _init_window_worker(workers, model_name):
+    limit_threads(workers)
+    get_model(model_name)
+
+def _transcribe_window(audio, offset, model_name, options):
+    result = get_model(model_name).transcribe(audio, **options)
+    segments = result['segments']
+    for segment in segments:
+        segment['start'] += offset
+        segment['end'] += offset
+        for word in segment.get('words', []):
+            word['start'] += offset
+            word['end'] += offset
+    return segments
+
+def _get_window_pool(model_name):
+    """Window workers are spawned with the model preloaded, so a different model needs a new pool."""
+    global _window_pool, _window_pool_model
+    if _window_pool is not None and _window_pool_model != model_name:
+        _window_pool.shutdown(wait=True)
+        _window_pool = None
+    if _window_pool is None:
+        workers = custom_env.TRANSCRIBE_WORKERS
+        _window_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_window_worker,
+            initargs=(workers, model_name)
+        )
+        _window_pool_model = model_name
+    return _window_pool
+
+def shutdown_window_pool():
+    """Stop the window workers and wait for them to exit."""
+    global _window_pool, _window_pool_model
+    if _window_pool is not None:
+        _window_pool.shutdown(wait=True)
+        _window_pool = None
+        _window_pool_model = None
+
+def transcribe_windowed(audio, **options):
+    """Transcribe long audio as overlapping windows on worker processes and merge them into one timeline."""
+    sample_rate = whisper.audio.SAMPLE_RATE
+    overlap = int(custom_env.WINDOW_OVERLAP_SECONDS * sample_rate)
+    cuts = find_window_cuts(audio, custom_env.WINDOW_SECONDS)
+    logger_config.info(f"Transcribing {len(cuts) - 1} windows on {custom_env.TRANSCRIBE_WORKERS} workers")
+
+    model_name = custom_env.WHISPER_MODEL
+    pool = _get_window_pool(model_name)
+    futures = []
+    for start, end in zip(cuts, cuts[1:]):
+        window_start = max(0, start - overlap)
+        window_end = min(len(audio), end + overlap)
+        futures.append(pool.submit(_transcribe_window, audio[window_start:window_end], window_start / sample_rate, model_name, options))
+
+    merged = []
+    for (start, end), future in zip(zip(cuts, cuts[1:]), futures):
+        owned_start = start / sample_rate
+        owned_end = end / sample_rate
+        # Each window only keeps the segments centred in its own span, so the overlap is not transcribed twice
+        for segment in future.result():
+            middle = (segment['start'] + segment['end']) / 2
+            if owned_start <= middle < owned_end:
+                merged.append(segment)
+
+    for i, segment in enumerate(merged):
+        segment['id'] = i
+        segment['seek'] = int(segment['start'] * sample_rate / whisper.audio.HOP_LENGTH)
+    return {'text': ''.join(segment['text'] for segment in merged), 'segments': merged}
+
+def _use_windows(audio):
+    return custom_env.TRANSCRIBE_WORKERS > 1 and len(audio) / whisper.audio.SAMPLE_RATE >= custom_env.WINDOWED_TRANSCRIBE_MIN_SECONDS
+
+def _transcribe_now(audio_path, audio, options):
+    if audio is None:
+        audio = whisper.load_audio(audio_path)
+    duration = len(audio) / whisper.audio.SAMPLE_RATE
+    started = time.time()
+    if _use_windows(audio):
+        result = transcribe_windowed(audio, **options)
+    else:
+        result = get_model().transcribe(audio, **options)
+    elapsed = time.time() - started
+    rtf = elapsed / duration if duration else 0.0
+
+    _stats['jobs_done'] += 1
+    _stats['history'].append({
+        'audio_path': audio_path,
+        'duration': duration,
+        'elapsed': elapsed,
+        'rtf': rtf,
+    })
+    logger_config.info(f"Transcribed {audio_path}: {duration:.1f}s of audio in {elapsed:.1f}s, rtf:: {rtf:.3f}, queue depth:: {queue_depth()}")
+    return {'text': result['text'], 'segments': result['segments']}
+
+def _run_jobs():
+    while True:
+        audio_path, audio, options, future = _jobs.get()
+        try:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(_transcribe_now(audio_path, audio, options))
+            except Exception as e:
+                _stats['jobs_failed'] += 1
+                future.set_exception(e)
+        finally:
+            _jobs.task_done()
+
+def submit(audio_path, audio=None, **options):
+    """Queue a transcription job on the resident worker and return a Future of {'text', 'segments'}."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_jobs, name='transcriber', daemon=True)
+            _worker.start()
+    future = Future()
+    _jobs.put((audio_path, audio, options, future))
+    return future
+
+def _cached_transcribe(audio_path, **options):
+    # A cache hit costs one decode and a hash; only misses reach the model
+    audio = whisper.load_audio(audio_path)
+    model_name = custom_env.WHISPER_MODEL
+    key = transcript_cache.make_key(audio, model_name, dict(options, windowed=_use_windows(audio)))
+    result = transcript_cache.get(key)
+    if result is not None:
+        return result
+
+    result = submit(audio_path, audio=audio, **options).result()
+    transcript_cache.put(key, model_name, result)
+    return result
+
+def align_words(audio_path, start, end, pad=None):
+    """Word timestamps for one stretch of audio, without running the alignment pass over the whole file."""
+    pad = custom_env.ALIGN_PAD_SECONDS if pad is None else pad
+    span_start = max(0, start - pad)
+    result = transcribe_span(audio_path, span_start, end + pad - span_start, word_timestamps=True)
+
+    words = []
+    for segment in result['segments']:
+        for word in segment.get('words', []):
+            # Rounded like Whisper's own timestamps, since they end up in captions and on-screen labels
+            word = dict(word, start=round(word['start'] + span_start, 2), end=round(word['end'] + span_start, 2))
+            if start <= (word['start'] + word['end']) / 2 <= end:
+                words.append(word)
+    return words
+
+def _span_transcribe(audio_path, start=0, seconds=None, **options):
+    # Spans are short and mostly one-off checks, so they skip the transcript cache
+    audio = load_audio_span(audio_path, start, seconds)
+    return submit(audio_path, audio=audio, **options).result()
+
+def remote_transcribe(audio_path, address=None, span=None, **options):
+    request = {'audio_path': os.path.abspath(audio_path), 'options': options}
+    if span is not None:
+        request['span'] = span
+    conn = Client(address or custom_env.TRANSCRIBER_ADDRESS, authkey=custom_env.TRANSCRIBER_AUTHKEY)
+    try:
+        conn.send(request)
+        response = conn.recv()
+    finally:
+        conn.close()
+
+    if 'error' in response:
+        raise RuntimeError(response['error'])
+    return response['result']
+
+def remote_stats(address=None):
+    conn = Client(address or custom_env.TRANSCRIBER_ADDRESS or DEFAULT_ADDRESS, authkey=custom_env.TRANSCRIBER_AUTHKEY)
+    try:
+        conn.send({'stats': True})
+        return conn.recv()
+    finally:
+        conn.close()
+
+def transcribe(audio_path, **options):
+    """Transcribe through the service when one is configured, otherwise on the in-process worker."""
+    if custom_env.TRANSCRIBER_ADDRESS:
+        try:
+            return remote_transcribe(audio_path, **options)
+        except OSError as e:
+            logger_config.warning(f"Transcriber service not reachable, transcribing in-process: {str(e)}")
+    return _cached_transcribe(audio_path, **options)
+
+def transcribe_span(audio_path, start=0, seconds=None, **options):
+    """Transcribe `seconds` of audio from `start` (to the end when None), through the service when one is
+    configured. Timestamps in the result are relative to `start`."""
+    if custom_env.TRANSCRIBER_ADDRESS:
+        try:
+            return remote_transcribe(audio_path, span=(start, seconds), **options)
+        except OSError as e:
+            logger_config.warning(f"Transcriber service not reachable, transcribing in-process: {str(e)}")
+    return _span_transcribe(audio_path, start, seconds, **options)
+
+def _handle_connection(conn):
+    try:
+        request = conn.recv()
+        if request.get('stats'):
+            conn.send(get_stats())
+            return
+        try:
+            options = request.get('options', {})
+            if request.get('span') is not None:
+                result = _span_transcribe(request['audio_path'], *request['span'], **options)
+            else:
+                result = _cached_transcribe(request['audio_path'], **options)
+            conn.send({'result': result})
+        except Exception as e:
+            logger_config.error(f"Transcription job failed for {request.get('audio_path')}: {str(e)}")
+            conn.send({'error': str(e)})
+    except Exception as e:
+        logger_config.error(f"Error in transcriber connection: {str(e)}")
+    finally:
+        conn.close()
+
+def serve(address=None):
+    address = address or custom_env.TRANSCRIBER_ADDRESS or DEFAULT_ADDRESS
+    get_model()
+    with Listener(address, authkey=custom_env.TRANSCRIBER_AUTHKEY) as listener:
+        logger_config.success(f"Transcriber service listening on {address}")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_connection, args=(conn,), daemon=True).start()
+
+if __name__ == "__main__":
+    serve()
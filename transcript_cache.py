@@ -0,0 +1,86 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logger_config
+import custom_env
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def _connect():
+    conn = sqlite3.connect(custom_env.TRANSCRIPT_CACHE_PATH, timeout=30)
+    conn.execute("""CREATE TABLE IF NOT EXISTS transcripts (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        text TEXT NOT NULL,
+        segments TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        lastUsed REAL NOT NULL
+    )""")
+    return conn
+
+def make_key(audio, model_name, options):
+    """Key a transcript by the decoded 16 kHz PCM, so re-encoded copies of the same narration still hit."""
+    digest = hashlib.sha256(audio.tobytes())
+    digest.update(model_name.encode())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    return digest.hexdigest()
+
+def get_stats():
+    lookups = _stats['hits'] + _stats['misses']
+    return dict(_stats, hit_rate=_stats['hits'] / lookups if lookups else 0.0)
+
+def get(key):
+    conn = None
+    try:
+        with _lock:
+            conn = _connect()
+            row = conn.execute("SELECT text, segments FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                _stats['misses'] += 1
+                return None
+            conn.execute("UPDATE transcripts SET lastUsed = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            _stats['hits'] += 1
+        logger_config.info(f"Transcript cache hit:: {key[:12]} {get_stats()}")
+        return {'text': row[0], 'segments': json.loads(row[1])}
+    except Exception as e:
+        logger_config.error(f"Error reading transcript cache: {str(e)}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def put(key, model_name, result):
+    conn = None
+    try:
+        segments = json.dumps(result['segments'], default=float)
+        size = len(result['text'].encode()) + len(segments)
+        with _lock:
+            conn = _connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, model, text, segments, size, lastUsed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, result['text'], segments, size, time.time())
+            )
+            _evict(conn)
+            conn.commit()
+    except Exception as e:
+        logger_config.error(f"Error writing transcript cache: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+def _evict(conn):
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+    if total <= custom_env.TRANSCRIPT_CACHE_MAX_BYTES:
+        return
+
+    for key, size in conn.execute("SELECT key, size FROM transcripts ORDER BY lastUsed ASC").fetchall():
+        if total <= custom_env.TRANSCRIPT_CACHE_MAX_BYTES:
+            break
+        conn.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+        total -= size
+        _stats['evictions'] += 1
+        logger_config.info(f"Evicted transcript cache entry:: {key[:12]}")
@@ -0,0 +1,90 @@
+import re
+from bisect import bisect_left, bisect_right
+
+def normalize(text):
+    return text.strip().lower().replace(".", "")
+
+class TranscriptIndex:
+    """Normalized transcript built once per set of segments.
+
+    All segment texts are joined with single spaces into `text`, with the character span of every
+    segment and word token recorded, so phrase lookups are one str.find plus a bisect instead of
+    re-concatenating segment text for every marker."""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.ids = [segment['id'] for segment in segments]
+        self.texts = [normalize(segment['text']) for segment in segments]
+        self.text = " ".join(self.texts)
+
+        self.offsets = []
+        self.ends = []
+        position = 0
+        for text in self.texts:
+            self.offsets.append(position)
+            position += len(text)
+            self.ends.append(position)
+            position += 1
+
+        self.words = []
+        self.word_offsets = []
+        self.aligned = []
+        for i, segment in enumerate(segments):
+            tokens = list(re.finditer(r"\S+", self.texts[i]))
+            timed = segment.get('words') or []
+            self.aligned.append(bool(timed) and len(timed) == len(tokens))
+            for j, token in enumerate(tokens):
+                # Whisper word timings when they line up with the tokens, else the segment bounds
+                source = timed[j] if len(timed) == len(tokens) else segment
+                self.words.append({
+                    'word': token.group(),
+                    'start': source['start'],
+                    'end': source['end'],
+                    'offset': self.offsets[i] + token.start(),
+                    'segment': i,
+                })
+                self.word_offsets.append(self.offsets[i] + token.start())
+
+    def position_of(self, segment):
+        return bisect_left(self.ids, segment['id'])
+
+    def segment_at(self, offset):
+        return bisect_right(self.offsets, offset) - 1
+
+    def find(self, phrase, first=0):
+        """Return (start, end) character offsets of the first match starting in or after segment `first`."""
+        if first >= len(self.segments):
+            return None
+        phrase = normalize(phrase)
+        start = self.text.find(phrase, self.offsets[first])
+        if start == -1:
+            return None
+        return start, start + len(phrase)
+
+    def find_segment(self, phrase, first=0):
+        """Position of the segment in which the first match (searching from segment `first`) is complete."""
+        match = self.find(phrase, first)
+        if match is None:
+            return None
+        return bisect_left(self.ends, match[1], lo=first)
+
+    def find_time(self, phrase, first=0):
+        """Start and end time of the first match, taken from the word tokens it covers."""
+        match = self.find(phrase, first)
+        if match is None or not self.words:
+            return None
+        first_word = max(0, bisect_right(self.word_offsets, match[0]) - 1)
+        last_word = max(first_word, bisect_left(self.word_offsets, match[1]) - 1)
+        return self.words[first_word]['start'], self.words[last_word]['end']
+
+    def segments_with(self, phrase):
+        """Sorted positions of the segments whose own text contains the phrase."""
+        phrase = normalize(phrase)
+        hits = []
+        start = self.text.find(phrase)
+        while start != -1:
+            i = self.segment_at(start)
+            if start + len(phrase) <= self.ends[i] and (not hits or hits[-1] != i):
+                hits.append(i)
+            start = self.text.find(phrase, start + 1)
+        return hits
@@ -1,7 +1,14 @@
 import common
 import logger_config
+import transcript_index
 from moviepy.editor import VideoFileClip, AudioFileClip, CompositeAudioClip
 
+def find_hits(index, phrases):
+    """Sorted positions of the segments containing any of the phrases."""
+    if phrases is None:
+        return []
+    return sorted({i for text in phrases for i in index.segments_with(text)})
+
 def get(audio_path, fromText=None, endText=None, segments=None):
     path = f'audio/{common.generate_random_string()}.wav'
 
@@ -9,22 +16,18 @@ def get(audio_path, fromText=None, endText=None, segments=None):
     start = 0 if fromText is None else None
     end = audio.duration if endText is None else None
 
-    for i, segment in enumerate(segments):
-        if fromText is not None:
-            for text in fromText:
-                if text.lower() in segment['text'].lower():
-                    start = segments[i+1]['start']
-                    break
-
-        if endText is not None:
-            for text in endText:
-                if text.lower() in segment['text'].lower():
-                    end = segments[i-1]['end']
-                    break
-
-        if start is not None and end is not None:
-            break
-    
+    index = transcript_index.TranscriptIndex(segments)
+    from_hits = find_hits(index, fromText)
+    end_hits = find_hits(index, endText)
+
+    if from_hits or end_hits:
+        # Markers settle at the segment where both have been seen; repeats after that are ignored
+        settled = max(hits[0] for hits in (from_hits, end_hits) if hits)
+        if from_hits:
+            start = segments[max(i for i in from_hits if i <= settled) + 1]['start']
+        if end_hits:
+            end = segments[max(i for i in end_hits if i <= settled) - 1]['end']
+
     if start is None or end is None:
         return None
 
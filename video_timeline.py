@@ -0,0 +1,57 @@
+import bisect
+import heapq
+import numpy as np
+from moviepy.editor import VideoClip
+
+def flatten(slides):
+    """Resolve (frame, start, duration) slides, later ones drawn on top like CompositeVideoClip, into
+    back-to-back (frame, start, end) intervals covering 0 to the last end. Gaps get frame None."""
+    clips = [(start, start + duration, i, frame) for i, (frame, start, duration) in enumerate(slides) if duration > 0]
+    if not clips:
+        return []
+    boundaries = sorted({0} | {clip[0] for clip in clips} | {clip[1] for clip in clips})
+    by_start = sorted(clips, key=lambda clip: clip[0])
+
+    intervals = []
+    active = []
+    next_clip = 0
+    for start, end in zip(boundaries, boundaries[1:]):
+        while next_clip < len(by_start) and by_start[next_clip][0] <= start:
+            clip_start, clip_end, i, frame = by_start[next_clip]
+            heapq.heappush(active, (-i, clip_end, frame))
+            next_clip += 1
+        while active and active[0][1] <= start:
+            heapq.heappop(active)
+        # Clips that ended under a higher one are dropped lazily once they surface
+        frame = active[0][2] if active else None
+
+        if intervals and intervals[-1][0] is frame:
+            intervals[-1] = (frame, intervals[-1][1], end)
+        else:
+            intervals.append((frame, start, end))
+    return intervals
+
+class Timeline:
+    """Flattened slides kept sorted by start so the frame for time t is one bisect away,
+    instead of CompositeVideoClip testing every clip's range on every output frame."""
+
+    def __init__(self, slides):
+        self.intervals = flatten(slides)
+        if not self.intervals:
+            raise ValueError("No slides on the timeline")
+        self.starts = [start for _, start, _ in self.intervals]
+        self.duration = self.intervals[-1][2]
+        first = next(frame for frame, _, _ in self.intervals if frame is not None)
+        self.blank = np.zeros_like(first)
+
+    def frame_at(self, t):
+        i = max(0, bisect.bisect_right(self.starts, t) - 1)
+        frame = self.intervals[i][0]
+        return self.blank if frame is None else frame
+
+    def make_frame(self, t):
+        return self.frame_at(t)
+
+    def to_clip(self, duration=None):
+        # Past the last slide the final frame is held, e.g. when the narration runs longer
+        return VideoClip(self.make_frame, duration=duration if duration is not None else self.duration)